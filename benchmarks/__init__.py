@@ -0,0 +1 @@
+"""Benchmark harness for the ERICA hot paths; see benchmarks/run.py."""
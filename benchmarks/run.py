@@ -0,0 +1,215 @@
+"""Benchmarks for the dashboard's hot paths.
+
+Times data load, customer lookup, peer aggregation and lookup, batch
+scoring, the Future Loans simulation and chart rendering on synthetic
+tables of each requested size. Results are written with the commit and
+library versions to benchmarks/results, so runs of different versions can
+be compared:
+
+    python -m benchmarks.run run --sizes 1000 10000 100000 1000000
+    python -m benchmarks.run compare benchmarks/results/<old>.json benchmarks/results/<new>.json
+
+Sizes up to 10**7 rows work but need several GB of memory.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from benchmarks import synthetic
+from erica import charts, peers
+from erica.index import CustomerIndex
+from erica.scenarios import run_scenario
+from erica.scoring import CONCEPT_SCORES, ScoringModel
+from erica.store import ScoreStore, write_store
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+DEFAULT_SIZES = [10**3, 10**4, 10**5, 10**6]
+
+# Lookups per timing of the per-customer benchmarks
+LOOKUPS = 1000
+
+# A benchmark this much slower than the baseline is reported as a regression
+REGRESSION_THRESHOLD = 1.2
+
+
+def measure(fn, repeat):
+    """Wall-clock seconds of each of `repeat` calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def run_size(rows, repeat, work_dir, seed=0):
+    """Time every benchmark on one synthetic table size."""
+    scaled, unscaled = synthetic.score_tables(rows, seed)
+    segments = synthetic.segments(unscaled, seed)
+    store_dir = os.path.join(work_dir, f'store-{rows}')
+    rng = np.random.default_rng(seed)
+    results = []
+
+    def timed(name, fn, operations=1):
+        times = measure(fn, repeat)
+        results.append({'benchmark': name, 'rows': rows, 'operations': operations, 'repeat': repeat,
+                        'best': min(times), 'median': statistics.median(times)})
+        print(f'{name:>18} {rows:>10,} rows  best {min(times):9.4f}s  median {statistics.median(times):9.4f}s',
+              flush=True)
+
+    manifest = {}
+
+    def build():
+        manifest.update(write_store(store_dir, scaled, unscaled, synthetic.customer_groups(scaled, segments),
+                                    source='synthetic'))
+
+    timed('store_build', build)
+
+    def load():
+        score_store = ScoreStore(store_dir, manifest)
+        score_store.frame('scaled')
+        score_store.frame('unscaled')
+        return score_store
+
+    timed('data_load', load)
+    score_store = load()
+
+    customer_ids = score_store.table.column('CUSTOMER_ID').to_numpy()
+    timed('customer_index', lambda: CustomerIndex(customer_ids))
+    index = CustomerIndex(customer_ids)
+    sample = rng.choice(customer_ids, LOOKUPS)
+    scaled_frame = score_store.scaled
+
+    # As the dashboard does for the selected customer
+    timed('customer_lookup', lambda: [scaled_frame.iloc[index.position(c)] for c in sample], LOOKUPS)
+
+    frame = peers.peer_frame(score_store)
+    timed('peer_aggregation', lambda: peers.build_peer_cube(frame))
+    cube = peers.PeerCube(peers.build_peer_cube(frame))
+    keys = frame[['CUSTOMER_LOCATION', 'CUSTOMER_SEGMENT']].sample(LOOKUPS, replace=True, random_state=seed)
+
+    def peer_lookups():
+        for location, segment in keys.itertuples(index=False):
+            cell = cube.cell(location, segment)
+            cube.box_stats(cell)
+            cube.means(cell, CONCEPT_SCORES)
+
+    timed('peer_lookup', peer_lookups, LOOKUPS)
+
+    table = score_store.unscaled
+    timed('batch_scoring', lambda: ScoringModel.fit(table).score_array(table))
+    model = ScoringModel.fit(table)
+    timed('future_loans', lambda: run_scenario(table, model))
+
+    cell = cube.cell(*keys.iloc[0])
+    box_stats = cube.box_stats(cell)
+    peer_means = cube.means(cell, CONCEPT_SCORES)
+    customer_scores = scaled[CONCEPT_SCORES].to_numpy()[0]
+
+    def render():
+        charts.figure_png(charts.breakdown_figure(list(customer_scores), CONCEPT_SCORES))
+        charts.figure_png(charts.peer_boxplot_figure(box_stats, 0.5, 'Peers'))
+        charts.figure_png(charts.radar_figure(customer_scores, peer_means, CONCEPT_SCORES, 'Peers'))
+
+    timed('chart_render', render)
+    return results
+
+
+def environment():
+    """Commit and library versions the results were measured with."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': pa.__version__,
+        'matplotlib': matplotlib.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run(sizes, repeat, label=None, seed=0):
+    """Run every benchmark at every size and save the results; returns the results path."""
+    info = environment()
+    label = label or info['commit'] or time.strftime('%Y%m%d-%H%M%S')
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for rows in sizes:
+            results.extend(run_size(rows, repeat, work_dir, seed))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f'{label}.json')
+    with open(path, 'w') as f:
+        json.dump({'label': label, 'seed': seed, **info, 'results': results}, f, indent=2)
+    return path
+
+
+def compare(baseline_path, candidate_path, threshold=REGRESSION_THRESHOLD):
+    """Print the candidate's best times against the baseline's; returns the regressions."""
+    with open(baseline_path) as f:
+        baseline = {(r['benchmark'], r['rows']): r for r in json.load(f)['results']}
+    with open(candidate_path) as f:
+        candidate = json.load(f)['results']
+
+    regressions = []
+    print(f"{'benchmark':>18} {'rows':>10}  {'baseline':>10}  {'candidate':>10}  ratio")
+    for result in candidate:
+        key = (result['benchmark'], result['rows'])
+        if key not in baseline:
+            continue
+        ratio = result['best'] / baseline[key]['best']
+        flag = '  slower' if ratio > threshold else ''
+        print(f"{key[0]:>18} {key[1]:>10,}  {baseline[key]['best']:9.4f}s  {result['best']:9.4f}s  "
+              f"{ratio:5.2f}x{flag}")
+        if ratio > threshold:
+            regressions.append(key)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the ERICA hot paths on synthetic data.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks and save the results')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Table sizes in rows')
+    run_parser.add_argument('--repeat', type=int, default=3, help='Timed calls per benchmark')
+    run_parser.add_argument('--label', default=None, help='Results file name (default: current commit)')
+    run_parser.add_argument('--seed', type=int, default=0)
+
+    compare_parser = commands.add_parser('compare', help='Compare two results files')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                                help='Slowdown ratio reported as a regression')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        print(f'Results written to {run(args.sizes, args.repeat, args.label, args.seed)}')
+    else:
+        regressions = compare(args.baseline, args.candidate, args.threshold)
+        if regressions:
+            print(f'{len(regressions)} regressions above {args.threshold}x')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
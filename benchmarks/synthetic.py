@@ -0,0 +1,128 @@
+"""Synthetic customer tables with the schema of the scoring notebook's exports.
+
+Columns, category codes and rough distributions follow
+'Resilience Score Analysis Unscaled.csv' and the segments feed, so the
+benchmarks exercise the same code paths as the real data at any size.
+Every customer appears once per quarter, as in the exports.
+"""
+import numpy as np
+import pandas as pd
+
+from erica.scoring import FEATURES, ScoringModel
+
+QUARTERS = ['Q1 2024', 'Q4 2023']
+
+LOCATIONS = [
+    'NATIONAL CAPITAL REGION', 'REGION IV-A (CALABARZON)', 'REGION III (CENTRAL LUZON)',
+    'REGION VII (CENTRAL VISAYAS)', 'REGION XI (DAVAO REGION)', 'REGION VI (WESTERN VISAYAS)',
+    'REGION X (NORTHERN MINDANAO)', 'REGION I (ILOCOS REGION)', 'REGION V (BICOL REGION)',
+    'CORDILLERA ADMINISTRATIVE REGION (CAR)', 'REGION XII (SOCCSKSARGEN)', 'REGION II (CAGAYAN VALLEY)',
+    'REGION VIII (EASTERN VISAYAS)', 'REGION IX (ZAMBOANGA PENINSULA)', 'MIMAROPA REGION',
+    'REGION XIII (CARAGA)', 'NO_DATA',
+]
+LOCATION_WEIGHTS = [0.44, 0.15, 0.1, 0.06, 0.04, 0.04, 0.03, 0.02, 0.02, 0.02, 0.02, 0.01, 0.01, 0.01, 0.01,
+                    0.01, 0.01]
+
+# Category code frequencies observed in the unscaled export
+CODE_WEIGHTS = {
+    'SEC': ([1, 2, 3, 4, 5, 6, 7], [0.001, 0.009, 0.05, 0.148, 0.225, 0.211, 0.356]),
+    'EDUCATION': ([1, 2, 3], [0.077, 0.885, 0.038]),
+    'AUTO_LOAN_INDICATOR': ([0, 1, 2, 3], [0.737, 0.015, 0.006, 0.242]),
+    'HOUSING_LOAN_INDICATOR': ([0, 1, 2, 3], [0.916, 0.004, 0.002, 0.078]),
+    'SAVINGS_ACCOUNT_INDICATOR': ([0, 3], [0.013, 0.987]),
+    'CUSTOMER_SEGMENT': ([1, 2, 3, 4, 5, 6], [0.038, 0.159, 0.126, 0.011, 0.425, 0.241]),
+    'LOAN_BEHAVIOR': ([1, 3, 4], [0.037, 0.959, 0.004]),
+}
+
+# Median and spread (log scale) of the amount columns, and the share of near-zero values
+AMOUNTS = {
+    'MONTHLY_INCOME': (160000, 1.0, 0.0),
+    'TRANSACTION_AMOUNT_DEBIT': (6600, 1.5, 0.01),
+    'TRANSACTION_AMOUNT_CC': (40000, 1.3, 0.0),
+    'TRANSACTION_AMOUNT_IBFT': (50000, 1.4, 0.0),
+    'TOTAL_BALANCE': (40000, 1.5, 0.24),
+    'CURRENT_MONTH_BILLING': (9000, 1.6, 0.3),
+    'PREVIOUS_MONTH_BILLING': (20000, 1.5, 0.28),
+    'REVOLVING_BALANCE': (25000, 1.4, 0.45),
+    'LOAN_AMOUNT': (125000, 1.4, 0.0),
+}
+
+UNSCALED_COLUMNS = [
+    'CUSTOMER_ID', 'BANK_TENURE', 'SEC', 'DIGITAL_INDICATOR', 'CUSTOMER_LOCATION', 'AGE', 'GENDER', 'EDUCATION',
+    'MONTHLY_INCOME', 'QUARTER', 'TRANSACTION_AMOUNT_DEBIT', 'TRANSACTION_AMOUNT_CC', 'TRANSACTION_AMOUNT_IBFT',
+    'AUTO_LOAN_INDICATOR', 'HOUSING_LOAN_INDICATOR', 'SAVINGS_ACCOUNT_INDICATOR', 'CUSTOMER_SEGMENT',
+    'TOTAL_BALANCE', 'CURRENT_MONTH_BILLING', 'PREVIOUS_MONTH_BILLING', 'REVOLVING_BALANCE', 'LOAN_BEHAVIOR',
+    'LOAN_AMOUNT',
+]
+
+
+def _amounts(rng, n, median, sigma, zero_share):
+    values = rng.lognormal(np.log(median), sigma, n).round(2)
+    near_zero = rng.random(n) < zero_share
+    values[near_zero] = rng.uniform(-3, 3, near_zero.sum()).round(2)
+    return values
+
+
+def customer_rows(rows, seed=0):
+    """Unscaled customer table with `rows` rows, without scores."""
+    rng = np.random.default_rng(seed)
+    customers = -(-rows // len(QUARTERS))
+    customer_ids = np.round(rng.choice(10**9, customers, replace=False) / 7, 4)
+    ids = np.tile(customer_ids, len(QUARTERS))[:rows]
+    quarters = np.repeat(QUARTERS, customers)[:rows]
+
+    # Customer attributes stay the same across quarters
+    location = rng.choice(len(LOCATIONS), customers, p=np.asarray(LOCATION_WEIGHTS) / sum(LOCATION_WEIGHTS))
+    gender = rng.binomial(1, 0.38, customers)
+    age = np.clip(rng.normal(38, 9, customers), 21, 80).round(2)
+    tenure = rng.gamma(3.5, 3, customers).round(2)
+
+    columns = {
+        'CUSTOMER_ID': ids,
+        'BANK_TENURE': np.tile(tenure, len(QUARTERS))[:rows],
+        'DIGITAL_INDICATOR': rng.binomial(1, 0.89, rows),
+        'CUSTOMER_LOCATION': np.asarray(LOCATIONS, dtype=object)[np.tile(location, len(QUARTERS))[:rows]],
+        'AGE': np.tile(age, len(QUARTERS))[:rows],
+        'GENDER': np.tile(gender, len(QUARTERS))[:rows],
+        'QUARTER': quarters,
+    }
+    for column, (codes, weights) in CODE_WEIGHTS.items():
+        columns[column] = rng.choice(codes, rows, p=np.asarray(weights) / sum(weights))
+    for column, (median, sigma, zero_share) in AMOUNTS.items():
+        columns[column] = _amounts(rng, rows, median, sigma, zero_share)
+
+    table = pd.DataFrame(columns)[UNSCALED_COLUMNS]
+    numeric = [column for column in UNSCALED_COLUMNS if column not in ('CUSTOMER_LOCATION', 'QUARTER')]
+    table[numeric] = table[numeric].astype(np.float64)
+    return table
+
+
+def score_tables(rows, seed=0):
+    """Scaled and unscaled tables, scored the way the notebook scores the exports."""
+    unscaled = customer_rows(rows, seed)
+    scores = ScoringModel.fit(unscaled).score(unscaled)
+    unscaled = pd.concat([unscaled, scores], axis=1)
+
+    # The scaled export holds the z-scored features next to the same scores
+    scaled = unscaled.copy()
+    features = scaled[FEATURES]
+    scaled[FEATURES] = (features - features.mean()) / features.std(ddof=0)
+    return scaled, unscaled
+
+
+def segments(unscaled, seed=0):
+    """Segments feed rows for the customers in a table."""
+    rng = np.random.default_rng(seed + 1)
+    customer_ids = unscaled['CUSTOMER_ID'].drop_duplicates().to_numpy()
+    tiers = rng.choice([1, 2, 3, 4, 5, 6], len(customer_ids), p=[0.046, 0.044, 0.019, 0.005, 0.157, 0.729])
+    return pd.DataFrame({
+        'CUSTOMER_ID': customer_ids,
+        'CUSTOMER_GROUP': np.where(rng.random(len(customer_ids)) < 0.9, 'RETAIL', 'BUSINESS BANKING'),
+        'CUSTOMER_SEGMENT': pd.Series(tiers).map({tier: f'Tier {tier}' for tier in range(1, 7)}),
+    })
+
+
+def customer_groups(scaled, segments):
+    """CUSTOMER_GROUP for each row, joined from the segments feed as the store does."""
+    groups = segments.drop_duplicates('CUSTOMER_ID').set_index('CUSTOMER_ID')['CUSTOMER_GROUP']
+    return scaled['CUSTOMER_ID'].map(groups).to_numpy()
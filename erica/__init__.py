@@ -0,0 +1 @@
+"""Data, scoring and recommendation helpers shared by the ERICA dashboard pages."""
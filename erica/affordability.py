@@ -0,0 +1,86 @@
+"""Loan affordability and amortization kernels.
+
+Every function broadcasts over its array arguments, so grids of incomes,
+rates and tenors are priced in one call. Zero-rate loans are handled with
+array selects rather than per-element branches.
+"""
+import numpy as np
+import pandas as pd
+
+COMPOUNDING_PERIODS = 12  # Monthly compounding
+
+
+def _periods(annual_rate, years, periods):
+    rate = np.asarray(annual_rate, dtype=np.float64) / periods
+    months = np.asarray(years, dtype=np.float64) * periods
+    return rate, months
+
+
+def annuity_factor(rate, months):
+    """Present value of one unit paid each period; equals months when rate is zero."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rate == 0, months, (1 - (1 + rate) ** -months) / rate)
+
+
+def monthly_installment(principal, annual_rate, years, periods=COMPOUNDING_PERIODS):
+    """Level installment that repays principal over years at annual_rate."""
+    rate, months = _periods(annual_rate, years, periods)
+    return np.asarray(principal, dtype=np.float64) / annuity_factor(rate, months)
+
+
+def max_affordable_principal(income, share, annual_rate, years, periods=COMPOUNDING_PERIODS):
+    """Largest principal whose installment stays within share of income."""
+    rate, months = _periods(annual_rate, years, periods)
+    return np.asarray(income, dtype=np.float64) * share * annuity_factor(rate, months)
+
+
+def offer_grid(incomes, rates, tenors, share, periods=COMPOUNDING_PERIODS):
+    """Maximum affordable principal for every income x rate x tenor.
+
+    Returns an array of shape (len(incomes), len(rates), len(tenors)).
+    """
+    incomes = np.asarray(incomes, dtype=np.float64)[:, None, None]
+    rates = np.asarray(rates, dtype=np.float64)[None, :, None]
+    tenors = np.asarray(tenors, dtype=np.float64)[None, None, :]
+    return max_affordable_principal(incomes, share, rates, tenors, periods)
+
+
+def amortization_schedule(principal, annual_rate, years, periods=COMPOUNDING_PERIODS):
+    """Month-by-month schedule for one or many loans.
+
+    Returns a dict of arrays with a trailing month axis (padded to the
+    longest tenor, zero after a loan is repaid): 'payment', 'interest',
+    'principal' and the closing 'balance'.
+    """
+    principal = np.asarray(principal, dtype=np.float64)
+    rate, months = _periods(annual_rate, years, periods)
+    principal, rate, months = np.broadcast_arrays(principal, rate, months)
+    payment = principal / annuity_factor(rate, months)
+
+    k = np.arange(1, int(np.ceil(months.max())) + 1)
+    shape = principal.shape + (1,)
+    p, r, n, a = (x.reshape(shape) for x in (principal, rate, months, payment))
+
+    # Balance after k payments: P(1+r)^k - A * ((1+r)^k - 1) / r, or P - A k when r is zero
+    growth = (1 + r) ** k
+    with np.errstate(divide='ignore', invalid='ignore'):
+        paid_factor = np.where(r == 0, k, (growth - 1) / r)
+    balance = np.where(k >= n, 0.0, np.clip(p * growth - a * paid_factor, 0, None))
+    opening = np.concatenate([p, balance[..., :-1]], axis=-1)
+
+    active = k <= n
+    interest = np.where(active, opening * r, 0.0)
+    payment = np.where(active, a, 0.0)
+    return {
+        'payment': payment,
+        'interest': interest,
+        'principal': payment - interest,
+        'balance': np.where(active, balance, 0.0),
+    }
+
+
+def sensitivity_table(income, share, rates, tenors, periods=COMPOUNDING_PERIODS):
+    """Maximum affordable principal for one income, tenors down and rates across."""
+    grid = offer_grid([income], rates, tenors, share, periods)[0]
+    return pd.DataFrame(grid.T, index=pd.Index(tenors, name='Years'),
+                        columns=[f'{rate:.0%}' for rate in rates])
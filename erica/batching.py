@@ -0,0 +1,67 @@
+"""Coalescing of concurrent single-item requests into batch calls.
+
+Requests submitted within a short window of each other are answered by one
+call of a batch handler, so a burst of per-customer requests costs one
+vectorized lookup and scoring pass instead of one per request. Requests
+that cannot share a call, such as recommendations under different loan
+scenarios, are kept apart by a group key.
+"""
+import asyncio
+
+# Seconds a request waits for others to join its batch
+COALESCE_WINDOW = 0.002
+
+# Batches are sent as soon as they reach this many requests
+MAX_COALESCED = 4096
+
+
+class RequestCoalescer:
+    """Answers concurrent submit() calls with shared calls of handler(group, items).
+
+    The handler receives the group key and the submitted items in arrival
+    order and returns one result per item. It runs on the event loop, so it
+    should be a short vectorized call.
+    """
+
+    def __init__(self, handler, window=COALESCE_WINDOW, max_batch_size=MAX_COALESCED):
+        self.handler = handler
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending = {}
+        self._timers = {}
+        self.batches = 0
+        self.requests = 0
+
+    async def submit(self, item, group=None):
+        """Result for one item, computed together with the other items in its batch."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(group, [])
+        pending.append((item, future))
+        if len(pending) >= self.max_batch_size:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = loop.call_later(self.window, self._flush, group)
+        return await future
+
+    def _flush(self, group):
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(group, [])
+        if not batch:
+            return
+        self.batches += 1
+        self.requests += len(batch)
+
+        try:
+            results = self.handler(group, [item for item, _ in batch])
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            # A caller that disconnected has already cancelled its future
+            if not future.done():
+                future.set_result(result)
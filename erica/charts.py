@@ -0,0 +1,210 @@
+"""Dashboard charts.
+
+Each chart has two renderers: a matplotlib figure, rasterized once and
+kept in an LRU cache of PNG bytes, and a Vega-Lite spec that the browser
+draws itself so the server does no rasterizing at all.
+"""
+import io
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import numpy as np
+import seaborn as sns
+
+# Rendered figures kept per server process
+FIGURE_CACHE_SIZE = 256
+
+# Same defaults st.pyplot uses
+PNG_DPI = 200
+
+
+class FigureCache:
+    """Thread-safe LRU cache of rendered PNG bytes."""
+
+    def __init__(self, max_entries=FIGURE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_or_render(self, key, render):
+        """PNG bytes for key, calling render() for a figure on a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        png = figure_png(render())
+        with self._lock:
+            self._entries[key] = png
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return png
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def figure_png(fig):
+    """Rasterize a figure and close it so it does not linger in pyplot."""
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format='png', dpi=PNG_DPI, bbox_inches='tight')
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+# Matplotlib renderers
+
+def breakdown_figure(score_values, scores):
+    fig, ax = plt.subplots(figsize=(8, 5))
+
+    # Define a green-based palette and apply to bar plot
+    palette = sns.color_palette("Greens", len(scores))
+    sns.barplot(x=score_values, y=scores, hue=scores, ax=ax, palette=palette, orient='h', legend=False)
+
+    # Enhance plot appearance
+    ax.set_xlabel("Score Contribution", fontsize=12, fontweight='bold', color="darkgreen")
+    ax.set_ylabel("")  # Removing y-label as the bar labels serve that role
+    ax.set_title("Resilience Score Breakdown", fontsize=14, fontweight='bold', color="darkgreen")
+
+    # Adjust grid and style
+    sns.despine(ax=ax, left=True, bottom=True)  # Clean up borders
+    ax.grid(axis='x', linestyle='--', alpha=0.6)  # Grid for x-axis only
+    return fig
+
+
+def peer_boxplot_figure(box_stats, resilience_score, title):
+    fig, ax = plt.subplots(figsize=(8, 4))
+    ax.bxp([box_stats], orientation='horizontal', widths=0.8, patch_artist=True,
+           boxprops={'facecolor': 'lightgrey'}, medianprops={'color': 'dimgrey'})
+    ax.set_yticks([])
+    ax.axvline(resilience_score, color='darkgreen', linestyle='--', label='Customer Score')
+    ax.set_title(title, fontsize=14, fontweight='bold', color="darkgreen")
+    ax.set_xlabel("Resilience Score", fontsize=12, fontweight='bold', color="darkgreen")
+    ax.legend(loc='upper right')
+    return fig
+
+
+def radar_figure(scores, peer_means, labels, title):
+    fig, ax = plt.subplots(figsize=(6, 6), subplot_kw={'projection': 'polar'})
+    angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
+
+    # Complete the loop for radar chart
+    scores = np.concatenate((scores, [scores[0]]))
+    peer_means = np.concatenate((peer_means, [peer_means[0]]))
+    angles += angles[:1]
+
+    # Plotting the radar chart for customer and peers
+    ax.plot(angles, scores, 'o-', color='darkgreen', label='Customer')
+    ax.fill(angles, scores, color='green', alpha=0.25)
+
+    ax.plot(angles, peer_means, 'o-', color='grey', label='Peer Average')
+    ax.fill(angles, peer_means, color='grey', alpha=0.25)
+
+    # Styling the radar chart
+    ax.set_yticklabels([])  # Hides radial labels for a cleaner look
+    ax.set_xticks(angles[:-1])
+    ax.set_xticklabels(labels, fontsize=10, fontweight='bold', color="darkgreen")
+    ax.set_title(title, fontsize=14, fontweight='bold', color="darkgreen")
+    ax.legend(loc='upper right')
+    return fig
+
+
+def trend_figure(quarters, trajectory, scores):
+    fig, ax = plt.subplots(figsize=(8, 4))
+    palette = sns.color_palette("Greens", len(scores) + 1)[1:]
+    for score, color in zip(scores, palette):
+        ax.plot(quarters, trajectory[score], 'o-', color=color, label=score.replace('_', ' '),
+                linewidth=3 if score == 'Resilience_Score' else 1.5)
+    ax.set_ylabel("Score", fontsize=12, fontweight='bold', color="darkgreen")
+    ax.set_title("Resilience Trend", fontsize=14, fontweight='bold', color="darkgreen")
+    ax.legend(loc='center left', bbox_to_anchor=(1, 0.5), frameon=False)
+    sns.despine(ax=ax)
+    ax.grid(axis='y', linestyle='--', alpha=0.6)
+    return fig
+
+
+# Vega-Lite renderers
+
+def _title(text):
+    return {'text': text, 'color': 'darkgreen', 'fontSize': 14, 'fontWeight': 'bold'}
+
+
+def breakdown_spec(score_values, scores):
+    return {
+        'title': _title("Resilience Score Breakdown"),
+        'data': {'values': [{'score': s, 'value': float(v)} for s, v in zip(scores, score_values)]},
+        'mark': 'bar',
+        'encoding': {
+            'y': {'field': 'score', 'type': 'nominal', 'sort': None, 'title': None},
+            'x': {'field': 'value', 'type': 'quantitative', 'title': "Score Contribution"},
+            'color': {'field': 'score', 'type': 'nominal', 'sort': None, 'legend': None,
+                      'scale': {'scheme': 'greens'}},
+        },
+    }
+
+
+def peer_boxplot_spec(box_stats, resilience_score, title):
+    stats = {k: float(box_stats[k]) for k in ('q1', 'med', 'q3', 'whislo', 'whishi')}
+    x = {'type': 'quantitative', 'title': "Resilience Score", 'scale': {'zero': False}}
+    return {
+        'title': _title(title),
+        'height': 120,
+        'layer': [
+            {'data': {'values': [stats]}, 'mark': {'type': 'rule'},
+             'encoding': {'x': {'field': 'whislo', **x}, 'x2': {'field': 'whishi'}}},
+            {'data': {'values': [stats]}, 'mark': {'type': 'bar', 'size': 60, 'color': 'lightgrey', 'stroke': 'black'},
+             'encoding': {'x': {'field': 'q1', **x}, 'x2': {'field': 'q3'}}},
+            {'data': {'values': [stats]}, 'mark': {'type': 'tick', 'size': 60, 'color': 'dimgrey', 'orient': 'vertical'},
+             'encoding': {'x': {'field': 'med', **x}}},
+            {'data': {'values': [{'value': float(v)} for v in box_stats['fliers']]},
+             'mark': {'type': 'point', 'color': 'black'}, 'encoding': {'x': {'field': 'value', **x}}},
+            {'data': {'values': [{'value': float(resilience_score), 'label': 'Customer Score'}]},
+             'mark': {'type': 'rule', 'color': 'darkgreen', 'strokeDash': [6, 4], 'size': 2},
+             'encoding': {'x': {'field': 'value', **x}, 'tooltip': [{'field': 'label'}, {'field': 'value'}]}},
+        ],
+    }
+
+
+def radar_spec(scores, peer_means, labels, title):
+    # Browsers get a grouped bar chart; Vega-Lite has no polar line plots
+    values = ([{'score': l, 'who': 'Customer', 'value': float(v)} for l, v in zip(labels, scores)]
+              + [{'score': l, 'who': 'Peer Average', 'value': float(v)} for l, v in zip(labels, peer_means)])
+    return {
+        'title': _title(title),
+        'data': {'values': values},
+        'mark': 'bar',
+        'encoding': {
+            'y': {'field': 'score', 'type': 'nominal', 'sort': None, 'title': None},
+            'yOffset': {'field': 'who'},
+            'x': {'field': 'value', 'type': 'quantitative', 'title': "Score"},
+            'color': {'field': 'who', 'type': 'nominal', 'title': None,
+                      'scale': {'domain': ['Customer', 'Peer Average'], 'range': ['darkgreen', 'grey']}},
+        },
+    }
+
+
+def trend_spec(quarters, trajectory, scores):
+    values = [{'quarter': q, 'score': score.replace('_', ' '), 'value': float(v)}
+              for score in scores for q, v in zip(quarters, trajectory[score])]
+    return {
+        'title': _title("Resilience Trend"),
+        'data': {'values': values},
+        'mark': {'type': 'line', 'point': True},
+        'encoding': {
+            'x': {'field': 'quarter', 'type': 'ordinal', 'sort': None, 'title': None},
+            'y': {'field': 'value', 'type': 'quantitative', 'title': "Score"},
+            'color': {'field': 'score', 'type': 'nominal', 'sort': None, 'title': None,
+                      'scale': {'scheme': 'greens'}},
+        },
+    }
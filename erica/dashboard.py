@@ -0,0 +1,164 @@
+"""Streamlit-side loaders shared by every dashboard page."""
+import contextlib
+import functools
+import math
+
+import pandas as pd
+import streamlit as st
+
+from erica import charts, history, optimizer, peers, profiling, ranks, scoring, screening, similar, store
+from erica.index import CustomerIndex
+
+# Number of customer IDs offered in the picker at a time
+PICKER_PAGE_SIZE = 50
+
+
+@st.cache_resource
+def load_store_registry():
+    # One memory-mapped store per server process, shared by all sessions and reruns
+    return store.StoreRegistry()
+
+
+def load_store():
+    """The current store; a newly published version is picked up without a restart."""
+    return load_store_registry().current()
+
+
+# Derived structures are cached per store version; the previous version is
+# kept for sessions still rendering it, older ones are dropped
+@st.cache_resource(max_entries=2)
+def load_customer_index(_score_store, version):
+    return CustomerIndex(_score_store.table.column('CUSTOMER_ID').to_numpy(), version=version)
+
+
+def customer_picker(index, container=st.sidebar):
+    """Searchable, paginated CUSTOMER_ID picker; returns the selected ID."""
+    search = container.text_input("Search Customer ID", placeholder="Start typing an ID")
+    total = len(index.search(search.strip()))
+    if total == 0:
+        container.warning("No customer matches that ID.")
+        return None
+
+    pages = math.ceil(total / PICKER_PAGE_SIZE)
+    page = 0
+    if pages > 1:
+        page = container.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, step=1) - 1
+    options, _ = index.page(search.strip(), page, PICKER_PAGE_SIZE)
+    container.caption(f"{total:,} matching customers")
+    return container.selectbox("Select Customer ID", options)
+
+
+@st.cache_resource(max_entries=2)
+def load_peers(_score_store, version):
+    return peers.load_peer_cube(_score_store)
+
+
+@st.cache_resource(max_entries=2)
+def load_ranks(_score_store, version):
+    return ranks.load_rank_index(_score_store)
+
+
+@st.cache_resource(max_entries=2)
+def load_similar(_score_store, version):
+    return similar.load_similarity_index(_score_store)
+
+
+@st.cache_resource(max_entries=2)
+def load_history(_score_store, version):
+    # Trajectories read through the same customer index as the picker
+    return history.ScoreHistory(_score_store, load_customer_index(_score_store, version))
+
+
+@st.cache_resource(max_entries=2)
+def load_screener(_score_store, version):
+    # Risk level, weak factor and peer key bitmaps over the whole portfolio
+    return screening.Screener(_score_store)
+
+
+@st.cache_resource(max_entries=2)
+def load_scoring_model(_score_store, version):
+    # Fitted population statistics
+    return scoring.load_store_model(_score_store)
+
+
+@st.cache_resource(max_entries=2)
+def load_optimizer(_score_store, version):
+    # Plans against the same fitted model the dashboard scores with
+    caps = optimizer.feature_caps(_score_store.unscaled)
+    return optimizer.TargetOptimizer(load_scoring_model(_score_store, version), caps)
+
+
+@st.cache_resource
+def load_figure_cache():
+    # Rendered charts shared by every session on this server
+    return charts.FigureCache()
+
+
+def show_chart(key, figure, spec, client_side=False):
+    """Draw a chart from the figure cache, or as a Vega-Lite spec in the browser.
+
+    figure and spec are called only when that renderer needs them.
+    """
+    if client_side:
+        st.vega_lite_chart(spec(), width='stretch')
+    else:
+        st.image(load_figure_cache().get_or_render(key, figure), width='stretch')
+
+
+@st.cache_resource
+def load_section_stats():
+    # Section totals across every session on this server
+    profiling.configure_log()
+    return profiling.SectionStats()
+
+
+def start_profile():
+    """Profiler for this rerun; memory is tracked when ERICA_PROFILE is set."""
+    profiler = profiling.Profiler(track_memory=profiling.enabled(), stats=load_section_stats())
+    st.session_state['profiler'] = profiler
+    return profiler
+
+
+def current_profile():
+    """Profiler of the rerun in progress, whether the whole page or only a fragment reruns."""
+    return st.session_state['profiler']
+
+
+def profiled(name=None):
+    """Decorator giving a fragment its rerun's profiler, and timing the fragment as one section when named.
+
+    The profiler is looked up on each call: during a full rerun it is that
+    rerun's, and when the fragment reruns on its own it gets a fresh one whose
+    timings are shown at the end of the fragment. Fragments that time their
+    own sections get it from current_profile().
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            profiler = st.session_state.get('profiler')
+            # Once the full rerun's panel is drawn, a call is a fragment rerun
+            fragment_rerun = profiler is None or st.session_state.get('profile_shown') == profiler.run_id
+            if fragment_rerun:
+                profiler = start_profile()
+            with profiler.section(name) if name else contextlib.nullcontext():
+                result = fn(*args, **kwargs)
+            if fragment_rerun:
+                profile_panel(profiler, container=st)
+            return result
+        return wrapper
+    return decorate
+
+
+def profile_panel(profiler, container=st.sidebar):
+    """Section timings of this rerun and of the server, shown when the URL has ?debug=1."""
+    st.session_state['profile_shown'] = profiler.run_id
+    if st.query_params.get('debug') != '1':
+        return
+    with container.expander("Profiling", expanded=True):
+        st.caption(f"Rerun {profiler.run_id}: {profiler.total_seconds() * 1000:,.1f} ms in sections")
+        st.dataframe(pd.DataFrame(profiler.sections).drop(columns='run'), hide_index=True)
+        peak = profiling.max_rss()
+        if peak is not None:
+            st.caption(f"Peak process memory: {peak / 2**20:,.0f} MiB")
+        st.caption("All sessions on this server")
+        st.dataframe(pd.DataFrame(load_section_stats().summary()), hide_index=True)
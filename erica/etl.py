@@ -0,0 +1,356 @@
+"""Streaming ETL for the raw feeds behind the resilience score.
+
+Each feed is read in fixed-size chunks. Transaction feeds are reduced to
+partial (CUSTOMER_ID, QUARTER) sums per chunk and folded into a running
+total, and customer-level feeds keep the first row per customer. Peak
+memory is set by the chunk size and the aggregated output, not by the
+size of the input files.
+
+    python -m erica.etl --data-dir "(Cleaned) Data" --out-dir etl_output --workers 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from erica.schema import KEY_COLUMN, compact
+from erica.store import read_frame, write_frame
+
+DATA_DIR = '(Cleaned) Data'
+OUTPUT_DIR = 'etl_output'
+CHUNKSIZE = 500_000
+
+KEYS = ['CUSTOMER_ID', 'QUARTER']
+
+# Feeds in the notebook's join order; the first is the customer master
+JOIN_ORDER = ['cdna', 'debit', 'cctrans', 'ibft', 'products', 'segments', 'ccconso', 'loan']
+
+# Rows the scoring table cannot use, as the notebook removed them after the join
+NO_DATA_COLUMNS = ['DIGITAL_INDICATOR', 'EDUCATION']
+REQUIRED_COLUMNS = ['TRANSACTION_AMOUNT_DEBIT', 'MONTHLY_INCOME', 'CURRENT_MONTH_BILLING', 'PREVIOUS_MONTH_BILLING']
+
+
+class Feed:
+    """How one source file is read and aggregated.
+
+    kind is 'transactions' (dated rows summed per customer-quarter),
+    'quarterly' (rows already labelled with a QUARTER, summed) or
+    'customer' (one row per customer, first occurrence kept).
+    """
+
+    def __init__(self, name, filename, kind, columns, sums=None, date_column=None,
+                 date_format=None, rename=None, required=None):
+        self.name = name
+        self.filename = filename
+        self.kind = kind
+        self.columns = columns
+        self.sums = sums or []
+        self.date_column = date_column
+        self.date_format = date_format
+        self.rename = rename or {}
+        self.required = required or []
+
+
+FEEDS = {
+    'cctrans': Feed('cctrans', 'CCTRANSACTIONS_Q42023_Q12024.csv', 'transactions',
+                    ['CUSTOMER_ID', 'TRANSACTION_DATE', 'TRANSACTION_AMOUNT'],
+                    sums=['TRANSACTION_AMOUNT'], date_column='TRANSACTION_DATE',
+                    rename={'TRANSACTION_AMOUNT': 'TRANSACTION_AMOUNT_CC'}),
+    'ibft': Feed('ibft', 'IBFT_OUTGOING_Q42023_Q12024.csv', 'transactions',
+                 ['CUSTOMER_ID', 'TRANSACTION_DATE', 'TRANSACTION_AMOUNT'],
+                 sums=['TRANSACTION_AMOUNT'], date_column='TRANSACTION_DATE',
+                 rename={'TRANSACTION_AMOUNT': 'TRANSACTION_AMOUNT_IBFT'}),
+    'products': Feed('products', 'PRODUCTS_Q42023_Q12024.csv', 'transactions',
+                     ['CUSTOMER_ID', 'CURRENT_MONTH', 'AUTO_LOAN_INDICATOR', 'HOUSING_LOAN_INDICATOR',
+                      'SAVINGS_ACCOUNT_INDICATOR'],
+                     sums=['AUTO_LOAN_INDICATOR', 'HOUSING_LOAN_INDICATOR', 'SAVINGS_ACCOUNT_INDICATOR'],
+                     date_column='CURRENT_MONTH', date_format='%m/%Y'),
+    'debit': Feed('debit', 'debit_cleaned_aggregated.csv', 'quarterly',
+                  ['CUSTOMER_ID', 'QUARTER', 'TRANSACTION_AMOUNT'],
+                  sums=['TRANSACTION_AMOUNT'], rename={'TRANSACTION_AMOUNT': 'TRANSACTION_AMOUNT_DEBIT'}),
+    'cdna': Feed('cdna', 'cdna_cleaned.csv', 'customer',
+                 ['CUSTOMER_ID', 'BANK_TENURE', 'SEC', 'DIGITAL_INDICATOR', 'CUSTOMER_LOCATION', 'AGE',
+                  'GENDER', 'EDUCATION', 'MONTHLY_INCOME']),
+    'loan': Feed('loan', 'loan_cleaned.csv', 'customer',
+                 ['CUSTOMER_ID', 'LOAN_BEHAVIOR', 'LOAN_AMOUNT']),
+    'ccconso': Feed('ccconso', 'ccconso_cleaned_aggregated.csv', 'customer',
+                    ['CUSTOMER_ID', 'TOTAL_BALANCE', 'CURRENT_MONTH_BILLING', 'PREVIOUS_MONTH_BILLING',
+                     'REVOLVING_BALANCE']),
+    'segments': Feed('segments', 'SEGMENTS_Q42023_Q12024.csv', 'customer',
+                     ['CUSTOMER_ID', 'CUSTOMER_GROUP', 'CUSTOMER_SEGMENT'], required=['CUSTOMER_SEGMENT']),
+}
+
+
+def quarter_code(label):
+    """Integer quarter code (year * 10 + quarter) for a label like 'Q1 2024'."""
+    return int(label[3:]) * 10 + int(label[1])
+
+
+def quarter_codes(dates):
+    """Integer quarter codes (year * 10 + quarter) for a datetime Series."""
+    return (dates.dt.year * 10 + dates.dt.quarter).astype(np.int32)
+
+
+def quarter_codes_from_labels(labels):
+    """Integer quarter codes for labels like 'Q1 2024', parsed once per distinct label."""
+    codes, uniques = pd.factorize(labels)
+    if (codes < 0).any():
+        raise ValueError('Rows without a QUARTER label')
+    lookup = np.array([quarter_code(label) for label in uniques], dtype=np.int32)
+    return pd.Series(lookup[codes], index=labels.index)
+
+
+def quarter_labels(codes):
+    """'Q<quarter> <year>' labels for integer quarter codes, formatted once per distinct code."""
+    codes = pd.Series(codes)
+    uniques = codes.unique()
+    lookup = {code: f'Q{code % 10} {code // 10}' for code in uniques}
+    return codes.map(lookup).to_numpy()
+
+
+def _read_chunks(feed, path, chunksize):
+    return pd.read_csv(path, usecols=feed.columns, chunksize=chunksize)
+
+
+def _partial_sums(feed, chunk, quarter=None):
+    if feed.kind == 'transactions':
+        dates = pd.to_datetime(chunk[feed.date_column], format=feed.date_format)
+        codes = quarter_codes(dates)
+    else:
+        codes = quarter_codes_from_labels(chunk['QUARTER'])
+    partial = chunk[['CUSTOMER_ID'] + feed.sums].assign(QUARTER=codes)
+    if quarter is not None:
+        partial = partial[codes == quarter_code(quarter)]
+    return partial.groupby(KEYS, sort=False)[feed.sums].sum()
+
+
+def _fold(partials):
+    # Partial sums share keys across chunks, so summing them again gives the totals
+    return pd.concat(partials).groupby(level=KEYS, sort=False).sum()
+
+
+def aggregate_quarterly(feed, chunks, chunksize=CHUNKSIZE, quarter=None):
+    """Stream chunks of a transaction or quarterly feed into customer-quarter sums.
+
+    With quarter set (e.g. 'Q2 2024'), rows from other quarters are skipped.
+    """
+    total = None
+    pending = []
+    pending_rows = 0
+    for chunk in chunks:
+        partial = _partial_sums(feed, chunk, quarter)
+        pending.append(partial)
+        pending_rows += len(partial)
+        # Fold once the buffered partials reach a chunk's worth of rows
+        if pending_rows >= chunksize:
+            total = _fold(pending if total is None else [total] + pending)
+            pending, pending_rows = [], 0
+    if pending:
+        total = _fold(pending if total is None else [total] + pending)
+    if total is None:
+        return pd.DataFrame(columns=KEYS + [feed.rename.get(c, c) for c in feed.sums])
+
+    total = total.reset_index()
+    total['QUARTER'] = quarter_labels(total['QUARTER'])
+    return total.rename(columns=feed.rename)
+
+
+def aggregate_customers(feed, chunks):
+    """Stream chunks of a customer-level feed, keeping the first row per customer."""
+    parts = []
+    for chunk in chunks:
+        if feed.required:
+            chunk = chunk.dropna(subset=feed.required)
+        parts.append(chunk.drop_duplicates('CUSTOMER_ID'))
+    if not parts:
+        return pd.DataFrame(columns=feed.columns)
+    # Customers repeated across chunks keep their earliest row
+    parts = pd.concat(parts, ignore_index=True).drop_duplicates('CUSTOMER_ID', ignore_index=True)
+    return parts.rename(columns=feed.rename)
+
+
+def aggregate_feed(feed, data_dir=DATA_DIR, chunksize=CHUNKSIZE, quarter=None):
+    path = os.path.join(data_dir, feed.filename)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'Missing {feed.name} feed: {path}')
+    chunks = _read_chunks(feed, path, chunksize)
+    if feed.kind == 'customer':
+        return aggregate_customers(feed, chunks)
+    return aggregate_quarterly(feed, chunks, chunksize, quarter)
+
+
+def usable_rows(table):
+    """Mask of the rows the scoring table can use: no NO_DATA labels or missing required values."""
+    usable = np.ones(len(table), dtype=bool)
+    for column in NO_DATA_COLUMNS:
+        if column in table:
+            usable &= (table[column] != 'NO_DATA').to_numpy()
+    for column in REQUIRED_COLUMNS:
+        if column in table:
+            usable &= table[column].notna().to_numpy()
+    return usable
+
+
+def _positions_by_key(keys, size):
+    # Row of each key (-1 when absent), addressed directly by the dense integer key
+    positions = np.full(size, -1, dtype=np.int64)
+    valid = keys >= 0
+    positions[keys[valid]] = np.flatnonzero(valid)
+    return positions
+
+
+def join_feeds(tables, order=JOIN_ORDER):
+    """Inner-join the aggregated feeds in one pass; returns the joined table and its steps.
+
+    Customers are numbered by their row in the first (master) feed, and
+    every feed's rows are keyed by that number and, for quarterly feeds,
+    the quarter. Unusable and duplicate rows get no key, so nothing is
+    copied before the join. Each feed is then indexed once by key in a
+    dense array, the join is a series of array lookups for the rows of the
+    first quarterly feed, and the columns are gathered once at the end.
+    The result matches chaining pd.merge over `order` and filtering
+    afterwards, as the notebook does. Each step is a dict with its name,
+    the rows it started from and the rows it dropped.
+    """
+    steps = []
+    master = order[0]
+    quarterly = [name for name in order if FEEDS[name].kind != 'customer']
+    driver = quarterly[0]
+
+    def drop(name, keys, dropped, reason):
+        steps.append({'step': f'{name}: {reason}', 'rows': int((keys >= 0).sum()), 'dropped': int(dropped.sum())})
+        return np.where(dropped, -1, keys)
+
+    # Usable master rows, first row per customer
+    table = tables[master]
+    keys = drop(master, np.zeros(len(table), dtype=np.int64), ~usable_rows(table), 'NO_DATA or missing values')
+    ids = table['CUSTOMER_ID'].to_numpy()
+    duplicate = np.zeros(len(table), dtype=bool)
+    duplicate[keys >= 0] = pd.Index(ids[keys >= 0]).duplicated()
+    keys = drop(master, keys, duplicate, 'duplicate keys')
+    master_rows = np.flatnonzero(keys >= 0)
+    customer_ids = pd.Index(ids[master_rows])
+    customers = len(customer_ids)
+
+    # Quarter labels are parsed once per distinct label
+    labels = {name: pd.factorize(tables[name]['QUARTER']) for name in quarterly}
+    label_codes = {name: np.array([quarter_code(label) for label in uniques], dtype=np.int32)
+                   for name, (_, uniques) in labels.items()}
+    quarters = np.unique(np.concatenate(list(label_codes.values())))
+
+    feed_keys = {}
+    for name in order[1:]:
+        table = tables[name]
+        keys = customer_ids.get_indexer(table['CUSTOMER_ID'])
+        if name == driver:
+            # Rows of the driving feed whose customer is not in the master feed
+            outside = int((keys < 0).sum())
+        if name in quarterly:
+            codes, _ = labels[name]
+            quarter = np.searchsorted(quarters, label_codes[name])[codes]
+            keys = np.where((keys >= 0) & (codes >= 0), keys * len(quarters) + quarter, -1)
+        keys = drop(name, keys, (keys >= 0) & ~usable_rows(table), 'NO_DATA or missing values')
+        keys = drop(name, keys, (keys >= 0) & pd.Series(keys).duplicated().to_numpy(), 'duplicate keys')
+        feed_keys[name] = keys
+
+    # Join partners are looked up for the rows of the driving feed, dropping unmatched rows step by step
+    rows = np.flatnonzero(feed_keys[driver] >= 0)
+    row_keys = feed_keys[driver][rows]
+    row_customers = row_keys // len(quarters)
+    steps.append({'step': f'join {driver}', 'rows': len(rows) + outside, 'dropped': outside})
+    positions = {master: master_rows[row_customers], driver: rows}
+    joined = np.ones(len(rows), dtype=bool)
+    for name in order[1:]:
+        if name == driver:
+            continue
+        if name in quarterly:
+            positions[name] = _positions_by_key(feed_keys[name], customers * len(quarters))[row_keys]
+        else:
+            positions[name] = _positions_by_key(feed_keys[name], customers)[row_customers]
+        found = positions[name] >= 0
+        steps.append({'step': f'join {name}', 'rows': int(joined.sum()), 'dropped': int((joined & ~found).sum())})
+        joined &= found
+
+    # Rows in master order, then driver order, as chained merges leave them
+    kept = np.flatnonzero(joined)
+    kept = kept[np.argsort(row_customers[kept], kind='stable')]
+    columns = {}
+    for name in order:
+        table = tables[name]
+        taken = positions[name][kept]
+        for column in table.columns:
+            if column not in columns:
+                columns[column] = table[column].array.take(taken)
+        if name == master:
+            columns[KEY_COLUMN] = row_customers[kept].astype(np.int32)
+    return compact(pd.DataFrame(columns)), steps
+
+
+def combine_feeds(tables):
+    """Join the aggregated feeds into the scoring table, as the notebook does."""
+    return join_feeds(tables)[0]
+
+
+def _aggregate_to_file(name, data_dir, out_dir, chunksize, quarter=None):
+    # Runs in a worker process; the result goes to disk rather than back through a pipe
+    start = time.perf_counter()
+    table = compact(aggregate_feed(FEEDS[name], data_dir, chunksize, quarter))
+    path = os.path.join(out_dir, f'{name}.arrow')
+    write_frame(table, path)
+    return name, path, len(table), time.perf_counter() - start
+
+
+def run_pipeline(data_dir=DATA_DIR, out_dir=OUTPUT_DIR, chunksize=CHUNKSIZE, feeds=None, workers=None,
+                 quarter=None):
+    """Aggregate every feed, join them and write the results to out_dir.
+
+    The feeds are independent until the join, so they are aggregated
+    concurrently in a pool of `workers` processes (one per CPU by default).
+    With quarter set, only that quarter's activity is aggregated.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    names = list(feeds or FEEDS)
+    workers = min(workers or os.cpu_count() or 1, len(names))
+    start = time.perf_counter()
+
+    if workers == 1:
+        results = [_aggregate_to_file(name, data_dir, out_dir, chunksize, quarter) for name in names]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_aggregate_to_file, name, data_dir, out_dir, chunksize, quarter)
+                       for name in names]
+            results = [future.result() for future in futures]
+
+    tables = {}
+    for name, path, rows, elapsed in results:
+        tables[name] = read_frame(path)
+        print(f'{name}: {rows:,} rows in {elapsed:.2f}s')
+    print(f'aggregated {len(names)} feeds with {workers} worker(s) in {time.perf_counter() - start:.2f}s')
+
+    join_start = time.perf_counter()
+    combined, steps = join_feeds(tables)
+    for step in steps:
+        if step['dropped']:
+            print(f"  {step['step']}: dropped {step['dropped']:,} of {step['rows']:,} rows")
+    write_frame(combined, os.path.join(out_dir, 'combined.arrow'))
+    print(f'combined: {len(combined):,} rows in {time.perf_counter() - join_start:.2f}s '
+          f'-> {os.path.join(out_dir, "combined.arrow")}')
+    return combined
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Aggregate the raw ERICA feeds in fixed-size chunks.')
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--out-dir', default=OUTPUT_DIR)
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE, help='Rows read per chunk')
+    parser.add_argument('--workers', type=int, default=None, help='Feeds aggregated at once (default: CPU count)')
+    parser.add_argument('--quarter', default=None, help="Only aggregate one quarter, e.g. 'Q2 2024'")
+    args = parser.parse_args(argv)
+    run_pipeline(args.data_dir, args.out_dir, args.chunksize, workers=args.workers, quarter=args.quarter)
+
+
+if __name__ == '__main__':
+    main()
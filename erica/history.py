@@ -0,0 +1,135 @@
+"""Score history across quarters.
+
+The score store keeps one file per quarter and only ever gains quarters,
+so it already holds every customer's history; ScoreHistory indexes it. A
+customer's trajectory is read through the CUSTOMER_ID index, touching only
+that customer's rows. For each quarter, the score changes of customers
+scored in both it and the previous quarter are kept sorted, so "customers
+whose score fell by more than N" is a binary search.
+
+    python -m erica.history trajectory 17582714.2857
+    python -m erica.history fallen 0.1 --quarter "Q1 2024"
+"""
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+from erica.index import CustomerIndex
+from erica.schema import KEY_COLUMN
+from erica.scoring import RESILIENCE_SCORE, SCORE_COLUMNS
+from erica.store import open_store, quarter_key
+
+
+class ScoreHistory:
+    """Per-customer trajectories and quarter-on-quarter changes over a ScoreStore."""
+
+    def __init__(self, score_store, index=None):
+        self.store = score_store
+        self.version = score_store.version
+        table = score_store.table
+        self.index = index or CustomerIndex(table.column('CUSTOMER_ID').to_numpy(), version=self.version)
+
+        # Quarters oldest first, with each quarter's slice of the store's rows
+        self.quarters = sorted(score_store.quarters, key=quarter_key)
+        offsets = np.cumsum([0] + [q['rows'] for q in score_store.manifest['quarters']])
+        self._slices = {q['quarter']: (offsets[i], offsets[i + 1])
+                        for i, q in enumerate(score_store.manifest['quarters'])}
+        self._changes = {}
+        self._lock = threading.Lock()
+
+    def previous_quarter(self, quarter):
+        """The quarter before `quarter` in the store, or None for the first one."""
+        i = self.quarters.index(quarter)
+        return self.quarters[i - 1] if i > 0 else None
+
+    def trajectory(self, customer_id, columns=SCORE_COLUMNS):
+        """The customer's scores in each quarter they were scored, oldest first."""
+        positions = np.sort(self.index.positions(customer_id))
+        rows = self.store.table.select(['QUARTER'] + list(columns)).take(positions).to_pandas()
+        rows['QUARTER'] = rows['QUARTER'].astype(str)
+        order = sorted(range(len(rows)), key=lambda i: quarter_key(rows['QUARTER'].iloc[i]))
+        return rows.iloc[order].reset_index(drop=True)
+
+    def _column(self, quarter, column):
+        start, end = self._slices[quarter]
+        return self.store.table.column(column).slice(start, end - start).to_numpy()
+
+    def changes(self, quarter, column=RESILIENCE_SCORE):
+        """Score changes since the previous quarter, smallest (largest fall) first.
+
+        One row per customer scored in both quarters, with CUSTOMER_ID, the
+        previous and current score and the change. Built once per quarter
+        and column.
+        """
+        key = (quarter, column)
+        if key not in self._changes:
+            with self._lock:
+                if key not in self._changes:
+                    self._changes[key] = self._build_changes(quarter, column)
+        return self._changes[key]
+
+    def _build_changes(self, quarter, column):
+        previous = self.previous_quarter(quarter)
+        if previous is None:
+            return pd.DataFrame({'CUSTOMER_ID': np.empty(0), 'previous': np.empty(0), 'current': np.empty(0),
+                                 'change': np.empty(0)})
+
+        # Align the two quarters on the integer customer key
+        _, current_rows, previous_rows = np.intersect1d(
+            self._column(quarter, KEY_COLUMN), self._column(previous, KEY_COLUMN), return_indices=True)
+        current = self._column(quarter, column)[current_rows].astype(np.float64)
+        before = self._column(previous, column)[previous_rows].astype(np.float64)
+        change = current - before
+        order = np.argsort(change, kind='stable')
+        return pd.DataFrame({
+            'CUSTOMER_ID': self._column(quarter, 'CUSTOMER_ID')[current_rows][order],
+            'previous': before[order],
+            'current': current[order],
+            'change': change[order],
+        })
+
+    def change(self, customer_id, quarter=None, column=RESILIENCE_SCORE):
+        """The customer's score change into `quarter` (default: their latest), or None without a previous score."""
+        trajectory = self.trajectory(customer_id, [column])
+        quarters = list(trajectory['QUARTER'])
+        quarter = quarter or quarters[-1]
+        previous = self.previous_quarter(quarter)
+        if quarter not in quarters or previous not in quarters:
+            return None
+        values = trajectory.set_index('QUARTER')[column]
+        return float(values[quarter] - values[previous])
+
+    def fallen(self, threshold, quarter=None, column=RESILIENCE_SCORE):
+        """Customers whose score fell by more than `threshold` into `quarter` (default: the latest)."""
+        changes = self.changes(quarter or self.quarters[-1], column)
+        end = np.searchsorted(changes['change'].to_numpy(), -threshold, side='left')
+        return changes.iloc[:end]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Query the score history in the ERICA store.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    trajectory_parser = commands.add_parser('trajectory', help="A customer's scores per quarter")
+    trajectory_parser.add_argument('customer_id', type=float)
+    fallen_parser = commands.add_parser('fallen', help='Customers whose score fell since the previous quarter')
+    fallen_parser.add_argument('threshold', type=float, help='Minimum fall in resilience score')
+    fallen_parser.add_argument('--quarter', default=None, help='Quarter to compare with the one before (default: latest)')
+    fallen_parser.add_argument('--column', default=RESILIENCE_SCORE)
+    for command in (trajectory_parser, fallen_parser):
+        command.add_argument('--base-dir', default='.')
+        command.add_argument('--store-dir', default=None)
+    args = parser.parse_args(argv)
+
+    history = ScoreHistory(open_store(args.base_dir, args.store_dir))
+    if args.command == 'trajectory':
+        print(history.trajectory(args.customer_id).to_string(index=False))
+    else:
+        fallen = history.fallen(args.threshold, args.quarter, args.column)
+        print(fallen.to_string(index=False, formatters={'CUSTOMER_ID': '{:.4f}'.format}))
+        print(f'{len(fallen):,} customers fell by more than {args.threshold}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Incremental quarterly refresh of the score store.
+
+A new quarter is added without rebuilding history: only that quarter's
+activity is aggregated from the feeds, the population statistics are
+updated with a running mean/variance merge, and the scored rows are
+appended to the store as one more quarter file. Earlier quarters keep
+their stored scores unless --refresh is given, in which case every stored
+row is rescored with the updated statistics in one vectorized pass. Without
+--refresh, the new rows are also merged into the peer percentile ranks.
+
+    python -m erica.incremental "Q2 2024" --data-dir new_feeds
+"""
+import argparse
+import tempfile
+
+import pandas as pd
+
+from erica import etl
+from erica.ranks import extend_rank_index
+from erica.schema import KEY_COLUMN, compact, customer_keys, key_lookup
+from erica.scoring import FEATURES, SCORE_COLUMNS, feature_matrix, load_store_model, save_store_model
+from erica.store import GROUP_COLUMN, SCALED_SUFFIX, open_store, write_manifest, write_quarter
+
+def store_rows(score_store, rows, model):
+    """Score encoded rows and lay them out with the store's columns and types."""
+    rows = rows.reset_index(drop=True)
+    part = rows.drop(columns=[c for c in SCORE_COLUMNS if c in rows]).join(model.score(rows))
+    if GROUP_COLUMN not in part:
+        part[GROUP_COLUMN] = None
+
+    # Returning customers keep their key; new ones are numbered after the stored keys
+    stored = score_store.table.select(['CUSTOMER_ID', KEY_COLUMN]).to_pandas()
+    part[KEY_COLUMN] = customer_keys(part['CUSTOMER_ID'], key_lookup(stored))
+
+    z_scores = (feature_matrix(rows) - model.mean) / model.std
+    for i, feature in enumerate(FEATURES):
+        part[feature + SCALED_SUFFIX] = z_scores[:, i]
+    return compact(part[score_store.table.column_names])
+
+
+def aggregate_quarter(quarter, data_dir, model, chunksize=etl.CHUNKSIZE, workers=None):
+    """Aggregate one quarter's rows from the feeds and encode them with the model's mappings."""
+    with tempfile.TemporaryDirectory() as out_dir:
+        rows = etl.run_pipeline(data_dir, out_dir, chunksize, workers=workers, quarter=quarter)
+    rows = model.encode(rows)
+    complete = rows[FEATURES].notna().all(axis=1)
+    if not complete.all():
+        print(f'Skipping {(~complete).sum():,} rows with unmapped categories or missing features')
+    return rows[complete]
+
+
+def append_quarter(quarter, rows, base_dir='.', store_dir=None, refresh=False):
+    """Add a quarter's encoded rows to the store and update the fitted statistics."""
+    score_store = open_store(base_dir, store_dir)
+    if quarter in score_store.quarters:
+        raise ValueError(f'{quarter} is already in the store')
+    manifest = dict(score_store.manifest)
+    schema = score_store.table.schema
+
+    model = load_store_model(score_store)
+    model.update(rows)
+
+    # Quarter files are written under the new version's names; readers switch over with the manifest
+    manifest['revision'] += 1
+
+    if refresh:
+        # Rescore every stored row with the updated statistics in one pass
+        history = score_store.unscaled.copy()
+        history[GROUP_COLUMN] = score_store.table.column(GROUP_COLUMN).to_pandas()
+        history = pd.concat([history, rows], ignore_index=True)
+        model.refit_bounds(history)
+        history = store_rows(score_store, history, model)
+        for part_quarter in history['QUARTER'].unique():
+            write_quarter(score_store.store_dir, manifest, history[history['QUARTER'] == part_quarter], schema)
+    else:
+        part = store_rows(score_store, rows, model)
+        write_quarter(score_store.store_dir, manifest, part, schema)
+
+    write_manifest(score_store.store_dir, manifest)
+    save_store_model(score_store, model)
+    if not refresh:
+        # Stored scores are unchanged, so the new rows are merged into the previous percentile ranks
+        extend_rank_index(score_store.store_dir, score_store.version, manifest['version'], part)
+    return manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Add one new quarter to the ERICA score store.')
+    parser.add_argument('quarter', help="Quarter to add, e.g. 'Q2 2024'")
+    parser.add_argument('--data-dir', default=etl.DATA_DIR, help="Feeds holding the new quarter's activity")
+    parser.add_argument('--base-dir', default='.')
+    parser.add_argument('--store-dir', default=None)
+    parser.add_argument('--refresh', action='store_true', help='Rescore earlier quarters with the updated statistics')
+    parser.add_argument('--chunksize', type=int, default=etl.CHUNKSIZE)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    model = load_store_model(open_store(args.base_dir, args.store_dir))
+    rows = aggregate_quarter(args.quarter, args.data_dir, model, args.chunksize, args.workers)
+    manifest = append_quarter(args.quarter, rows, args.base_dir, args.store_dir, args.refresh)
+    print(f'Added {len(rows):,} rows for {args.quarter}; store version {manifest["version"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""CUSTOMER_ID index over the score store.
+
+The scaled and unscaled tables share row positions in the store, so one
+index serves both. Lookups go through a pandas hash index over the unique
+IDs, and prefix searches through a sorted array of ID labels.
+"""
+import numpy as np
+import pandas as pd
+
+
+class CustomerIndex:
+    """Maps each CUSTOMER_ID to its row positions in the store."""
+
+    def __init__(self, customer_ids, version=None):
+        ids = np.asarray(customer_ids)
+        self.version = version
+
+        # Group row positions by customer; a stable sort keeps store order within a customer
+        order = np.argsort(ids, kind='stable')
+        sorted_ids = ids[order]
+        starts = np.flatnonzero(np.r_[True, sorted_ids[1:] != sorted_ids[:-1]])
+        self._positions = order
+        self._offsets = np.r_[starts, len(ids)]
+        self._ids = pd.Index(sorted_ids[starts])
+
+        # Unique IDs in order of first appearance, for browsing without a search term
+        first_seen = order[starts]
+        self._browse = self._ids.to_numpy()[np.argsort(first_seen, kind='stable')]
+
+        # Sorted string labels for prefix search
+        labels = pd.Series(self._ids).astype(str).to_numpy(dtype=str)
+        label_order = np.argsort(labels, kind='stable')
+        self._labels = labels[label_order]
+        self._label_ids = self._ids.to_numpy()[label_order]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, customer_id):
+        return customer_id in self._ids
+
+    def positions(self, customer_id):
+        """All row positions for a customer, latest quarter first."""
+        i = self._ids.get_loc(customer_id)
+        return self._positions[self._offsets[i]:self._offsets[i + 1]]
+
+    def position(self, customer_id):
+        """Row position of the customer's first (latest) row."""
+        return self._positions[self._offsets[self._ids.get_loc(customer_id)]]
+
+    def latest_positions(self, customer_ids):
+        """Row positions of each customer's latest row, -1 where the ID is unknown."""
+        found = self._ids.get_indexer(pd.Index(customer_ids, dtype=self._ids.dtype))
+        positions = self._positions[self._offsets[np.maximum(found, 0)]]
+        return np.where(found >= 0, positions, -1)
+
+    def search(self, prefix=''):
+        """CUSTOMER_IDs whose label starts with prefix, as a slice-able array."""
+        if not prefix:
+            return self._browse
+        lo = np.searchsorted(self._labels, prefix, side='left')
+        hi = np.searchsorted(self._labels, prefix + '\uffff', side='left')
+        return self._label_ids[lo:hi]
+
+    def page(self, prefix='', page=0, page_size=50):
+        """One page of search results and the total number of matches."""
+        matches = self.search(prefix)
+        start = page * page_size
+        return matches[start:start + page_size], len(matches)
@@ -0,0 +1,205 @@
+"""Cheapest feature changes that reach a target resilience score.
+
+The resilience score is linear in the features: each feature's z-score is
+averaged into its concept, the concepts are averaged, and the result is
+min-max scaled with the fitted bounds. Reaching a target score therefore
+needs a fixed raw gain, sum(w_f * dx_f / std_f), and the optimizer picks
+the changes that deliver it at the least cost, sum(c_f * (dx_f / std_f)^2),
+with per-feature cost weights c_f.
+
+Features are only raised, and only up to a feasible cap: the portfolio's
+95th percentile for amounts and the highest observed code for coded
+features. Features a customer cannot act on (gender, loan behavior,
+segment and tenure) are left as they are. Under these bounds each feature
+is raised in proportion to w_f / c_f until it reaches its cap; the common
+multiplier is solved exactly from the sorted caps, for every customer and
+target at once.
+Coded features then move in whole steps, and the amounts are re-solved
+for whatever gap is left.
+
+    python -m erica.optimizer --target 0.5 --location "NATIONAL CAPITAL REGION" --output plans.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from erica.schema import CODE_COLUMNS
+from erica.scoring import CONCEPT_SCORES, FEATURES, RESILIENCE_SCORE, SCORE_COLUMNS, feature_matrix, load_store_model
+from erica.store import open_store, write_frame
+
+# Features a customer cannot change to improve their score
+FIXED_FEATURES = ['GENDER', 'LOAN_BEHAVIOR', 'CUSTOMER_SEGMENT', 'BANK_TENURE']
+
+# Cost of raising a feature by one standard deviation, relative to the default of 1
+COST_WEIGHTS = {
+    'SEC': 4.0,  # Socioeconomic class and education change slowly
+    'EDUCATION': 4.0,
+}
+
+# Amounts can be raised up to this quantile of the portfolio
+CAP_QUANTILE = 0.95
+
+# Rows solved together
+CHUNK_ROWS = 16384
+
+
+def feature_caps(table, quantile=CAP_QUANTILE):
+    """Highest feasible value of each feature in FEATURES order."""
+    matrix = feature_matrix(table)
+    caps = np.nanquantile(matrix, quantile, axis=0)
+    for i, feature in enumerate(FEATURES):
+        if feature in CODE_COLUMNS:
+            caps[i] = np.nanmax(matrix[:, i])
+    return caps
+
+
+def _raise(needed, headroom, ratio, weights):
+    # Raise each feature by lam * ratio, capped at its headroom, with the smallest lam whose gain meets `needed`.
+    # The gain is piecewise linear in lam, bending where a feature reaches its cap, so lam is solved exactly
+    # on the segment between the sorted caps where the gain crosses `needed`.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        breakpoints = np.where(ratio > 0, headroom / ratio, 0)
+    order = np.argsort(breakpoints, axis=1)
+    breakpoints = np.take_along_axis(breakpoints, order, axis=1)
+    slopes = np.take_along_axis(np.broadcast_to(ratio * weights, headroom.shape), order, axis=1)
+    capped = np.take_along_axis(headroom * weights, order, axis=1)
+
+    # Gain already locked in by the features capped before each segment, and the slope left on it
+    locked = np.cumsum(capped, axis=1) - capped
+    slope = slopes.sum(axis=1, keepdims=True) - (np.cumsum(slopes, axis=1) - slopes)
+    gain_at = locked + capped + breakpoints * (slope - slopes)
+    segment = np.minimum((gain_at < needed[:, None] - 1e-12).sum(axis=1), headroom.shape[1] - 1)
+    rows = np.arange(len(needed))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lam = (needed - locked[rows, segment]) / slope[rows, segment]
+    lam = np.where(np.isfinite(lam), np.clip(lam, 0, breakpoints[:, -1]), breakpoints[:, -1])
+    lam = np.where(needed > 0, lam, 0)
+    return np.minimum(lam[:, None] * ratio, headroom)
+
+
+class TargetOptimizer:
+    """Improvement plans against a fitted ScoringModel."""
+
+    def __init__(self, model, caps, costs=None):
+        self.model = model
+        self.caps = np.asarray(caps, dtype=np.float64)
+        costs = {**COST_WEIGHTS, **(costs or {})}
+        self.costs = np.array([costs.get(feature, 1.0) for feature in FEATURES])
+        self.fixed = np.isin(FEATURES, FIXED_FEATURES)
+        self.coded = np.isin(FEATURES, CODE_COLUMNS)
+
+        # Raw resilience gain per standard deviation of each feature, and the scaled score per raw unit
+        self.weights = model.weights.mean(axis=1)
+        self.span = model.score_max[-1] - model.score_min[-1]
+        self.ratio = np.where(self.fixed, 0, self.weights / self.costs)
+
+    def solve(self, matrix, targets):
+        """Feature changes, in raw units, that reach each row's target resilience score.
+
+        `targets` broadcasts against the rows. Rows whose target is out of
+        reach get the changes that come closest.
+        """
+        matrix = feature_matrix(matrix)
+        targets = np.broadcast_to(np.asarray(targets, dtype=np.float64), len(matrix))
+        if len(matrix) <= CHUNK_ROWS:
+            return self._solve(matrix, targets)
+        # Blocks of rows keep the per-feature temporaries in cache
+        return np.concatenate([self._solve(matrix[start:start + CHUNK_ROWS], targets[start:start + CHUNK_ROWS])
+                               for start in range(0, len(matrix), CHUNK_ROWS)])
+
+    def _solve(self, matrix, targets):
+        current = self.model.score_array(matrix)[:, -1]
+        needed = np.clip((targets - current) * self.span, 0, None)
+        std = self.model.std
+        headroom = np.where(self.fixed, 0, np.clip((self.caps - matrix) / std, 0, None))
+
+        steps = _raise(needed, headroom, self.ratio, self.weights)
+        if not self.coded.any():
+            return steps * std
+
+        # Coded features move in whole codes: the nearest, or rounded up where the amounts cannot close the gap
+        amounts = np.where(self.coded, 0, headroom)
+        reach = (amounts * self.weights).sum(axis=1)
+        plan = None
+        for round_codes in (np.round, np.ceil):
+            codes = np.minimum(round_codes(steps * std - 1e-9) / std, headroom) * self.coded
+            remaining = np.clip(needed - (codes * self.weights).sum(axis=1), 0, None)
+            candidate = codes + _raise(remaining, amounts, self.ratio, self.weights)
+            if plan is None:
+                plan, done = candidate, reach >= remaining - 1e-12
+            else:
+                plan = np.where(done[:, None], plan, candidate)
+        return plan * std
+
+    def plans(self, table, targets):
+        """One improvement plan per row: current and planned scores, cost, and each feature's change."""
+        matrix = feature_matrix(table)
+        changes = self.solve(matrix, targets)
+        current = self.model.score_array(matrix)
+        planned = self.model.score_array(matrix + changes)
+        steps = changes / self.model.std
+        frame = pd.DataFrame(index=table.index if isinstance(table, pd.DataFrame) else None)
+        frame['TARGET'] = np.broadcast_to(targets, len(matrix))
+        for i, column in enumerate(SCORE_COLUMNS):
+            frame[column] = current[:, i]
+            frame[f'PLANNED_{column}'] = planned[:, i]
+        frame['REACHED'] = planned[:, -1] >= frame['TARGET'].to_numpy() - 1e-9
+        frame['COST'] = (np.where(self.fixed, 0, self.costs) * steps ** 2).sum(axis=1)
+        for i, feature in enumerate(FEATURES):
+            if not self.fixed[i]:
+                frame[f'{feature}_CHANGE'] = changes[:, i]
+        return frame
+
+
+def load_optimizer(score_store, costs=None):
+    """Optimizer for the store's fitted model, with caps from the store's customers."""
+    return TargetOptimizer(load_store_model(score_store), feature_caps(score_store.unscaled), costs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Plan the cheapest feature changes that reach a target resilience score.')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--target', type=float, help='Target resilience score for every customer')
+    target.add_argument('--increase', type=float, help="Raise each customer's resilience score by this much")
+    parser.add_argument('--location', nargs='+', default=None, help='Only customers in these locations')
+    parser.add_argument('--segment', nargs='+', type=int, default=None, help='Only customers in these segment tiers')
+    parser.add_argument('--cost', nargs='+', default=[], metavar='FEATURE=WEIGHT', help='Override cost weights')
+    parser.add_argument('--output', default=None, help='Write the plans here')
+    parser.add_argument('--base-dir', default='.')
+    parser.add_argument('--store-dir', default=None)
+    args = parser.parse_args(argv)
+
+    costs = {}
+    for item in args.cost:
+        feature, _, weight = item.partition('=')
+        if feature not in FEATURES:
+            parser.error(f'Unknown feature {feature!r}')
+        costs[feature] = float(weight)
+
+    score_store = open_store(args.base_dir, args.store_dir)
+    optimizer = load_optimizer(score_store, costs)
+
+    # Plan from each customer's latest row
+    customers = score_store.unscaled.drop_duplicates('CUSTOMER_ID')
+    if args.location:
+        customers = customers[customers['CUSTOMER_LOCATION'].isin(args.location)]
+    if args.segment:
+        customers = customers[customers['CUSTOMER_SEGMENT'].isin(args.segment)]
+    current = optimizer.model.score_array(customers)[:, -1]
+    targets = np.full(len(customers), args.target) if args.target is not None else current + args.increase
+
+    plans = optimizer.plans(customers, targets)
+    plans.insert(0, 'CUSTOMER_ID', customers['CUSTOMER_ID'].to_numpy())
+    needed = plans['TARGET'] > plans[RESILIENCE_SCORE]
+    print(f'{needed.sum():,} of {len(plans):,} customers are below their target; '
+          f'{(plans["REACHED"] & needed).sum():,} of them can reach it')
+    print('Mean planned concept scores:')
+    for column in CONCEPT_SCORES:
+        print(f'  {column}: {plans[column].mean():.3f} -> {plans["PLANNED_" + column].mean():.3f}')
+    if args.output:
+        write_frame(plans, args.output)
+
+
+if __name__ == '__main__':
+    main()
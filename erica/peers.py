@@ -0,0 +1,139 @@
+"""Precomputed peer-group aggregates for the benchmarking tabs.
+
+The cube holds, for every (location, segment, group, quarter) cell and for
+the rollups over group and quarter, the peer count, the mean of each score
+and the box-plot statistics of each score. The tabs draw from these stored
+numbers instead of filtering and sorting the peer population on every rerun.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from erica.scoring import SCORE_COLUMNS
+from erica.store import replacing
+
+PEER_KEYS = ['CUSTOMER_LOCATION', 'CUSTOMER_SEGMENT', 'CUSTOMER_GROUP', 'QUARTER']
+
+# Key value for a dimension that has been rolled up
+ALL = 'ALL'
+
+# Group of customers with no CUSTOMER_GROUP; distinct from ALL so their cells do not collide with the rollups
+UNASSIGNED = 'UNASSIGNED'
+
+# Bumped whenever the cube's cells change, so cubes cached by older code are rebuilt
+CUBE_VERSION = 2
+
+# Box-plot whisker reach, in interquartile ranges (same as seaborn/matplotlib)
+WHISKER = 1.5
+
+BOX_STATS = ['q1', 'med', 'q3', 'whislo', 'whishi', 'min', 'max']
+
+
+def _grouping_sets():
+    # Exact cells plus every rollup over group and quarter
+    return [PEER_KEYS,
+            ['CUSTOMER_LOCATION', 'CUSTOMER_SEGMENT', 'CUSTOMER_GROUP'],
+            ['CUSTOMER_LOCATION', 'CUSTOMER_SEGMENT', 'QUARTER'],
+            ['CUSTOMER_LOCATION', 'CUSTOMER_SEGMENT']]
+
+
+def _aggregate(frame, keys):
+    grouped = frame.groupby(keys, sort=False, observed=True)
+    cells = grouped.size().rename('count').to_frame()
+    for column in SCORE_COLUMNS:
+        values = frame[column]
+        by_column = grouped[column]
+        cells[f'{column}_mean'] = by_column.mean()
+        cells[f'{column}_q1'] = by_column.quantile(0.25)
+        cells[f'{column}_med'] = by_column.median()
+        cells[f'{column}_q3'] = by_column.quantile(0.75)
+        cells[f'{column}_min'] = by_column.min()
+        cells[f'{column}_max'] = by_column.max()
+
+        # Whiskers end at the most extreme values inside the fences
+        q1 = by_column.transform('quantile', 0.25)
+        q3 = by_column.transform('quantile', 0.75)
+        reach = WHISKER * (q3 - q1)
+        key_values = [frame[k] for k in keys]
+        cells[f'{column}_whislo'] = values.where(values >= q1 - reach).groupby(
+            key_values, sort=False, observed=True).min()
+        cells[f'{column}_whishi'] = values.where(values <= q3 + reach).groupby(
+            key_values, sort=False, observed=True).max()
+
+    cells = cells.reset_index()
+    for key in PEER_KEYS:
+        if key not in keys:
+            cells[key] = ALL
+    return cells
+
+
+def peer_frame(score_store):
+    """Peer keys and scores for every row of the store.
+
+    Segments are taken from the unscaled table, so cells are keyed by tier.
+    """
+    table = score_store.table
+    frame = table.select(['CUSTOMER_LOCATION', 'CUSTOMER_GROUP', 'QUARTER'] + SCORE_COLUMNS).to_pandas()
+    frame['CUSTOMER_SEGMENT'] = table.column('CUSTOMER_SEGMENT').to_numpy()
+    return frame
+
+
+def build_peer_cube(frame):
+    """Aggregate a frame with PEER_KEYS and SCORE_COLUMNS into the peer cube."""
+    groups = frame['CUSTOMER_GROUP'].astype('category')
+    if UNASSIGNED not in groups.cat.categories:
+        groups = groups.cat.add_categories([UNASSIGNED])
+    # Keys stay categorical, which the group-bys are fastest on
+    frame = frame.assign(CUSTOMER_GROUP=groups.fillna(UNASSIGNED), QUARTER=frame['QUARTER'].astype('category'))
+    cube = pd.concat([_aggregate(frame, keys) for keys in _grouping_sets()], ignore_index=True)
+    return cube[PEER_KEYS + [c for c in cube.columns if c not in PEER_KEYS]]
+
+
+def summarize(frame):
+    """Cube aggregates of one ad hoc group of peers with SCORE_COLUMNS, as PeerCube.cell returns them."""
+    return _aggregate(frame.assign(**{key: ALL for key in PEER_KEYS}), PEER_KEYS).iloc[0]
+
+
+class PeerCube:
+    """Keyed lookups into the peer cube."""
+
+    def __init__(self, cube, version=None):
+        self.version = version
+        self.cube = cube.set_index(PEER_KEYS).sort_index()
+
+    def cell(self, location, segment, group=ALL, quarter=ALL):
+        """Aggregates for one peer group, or None when it has no members."""
+        try:
+            return self.cube.loc[(location, segment, group, quarter)]
+        except KeyError:
+            return None
+
+    def means(self, cell, columns):
+        return np.array([cell[f'{column}_mean'] for column in columns])
+
+    def box_stats(self, cell, column='Resilience_Score'):
+        """Statistics in the form matplotlib's Axes.bxp draws."""
+        stats = {stat: cell[f'{column}_{stat}'] for stat in BOX_STATS}
+        fliers = [v for v in (stats['min'], stats['max'])
+                  if v < stats['whislo'] or v > stats['whishi']]
+        return {'med': stats['med'], 'q1': stats['q1'], 'q3': stats['q3'],
+                'whislo': stats['whislo'], 'whishi': stats['whishi'], 'fliers': fliers,
+                'label': ''}
+
+
+def cube_path(store_dir, version):
+    return os.path.join(store_dir, f'peers-{version}-{CUBE_VERSION}.arrow')
+
+
+def load_peer_cube(score_store):
+    """Read the cube for the store's version, building it when the data changed."""
+    path = cube_path(score_store.store_dir, score_store.version)
+    if os.path.exists(path):
+        cube = feather.read_table(path).to_pandas()
+    else:
+        cube = build_peer_cube(peer_frame(score_store))
+        with replacing(path) as scratch:
+            feather.write_feather(cube, scratch, compression='uncompressed')
+    return PeerCube(cube, version=score_store.version)
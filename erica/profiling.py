@@ -0,0 +1,120 @@
+"""Section timings for dashboard reruns.
+
+Each rerun gets a Profiler; the page wraps its sections in
+profiler.section(name). Every finished section is logged as one JSON line
+on the 'erica.profile' logger and added to process-wide totals, so hot
+spots show up without attaching an external profiler.
+
+Timing is always on. Set ERICA_PROFILE=1 to also track Python-level memory
+with tracemalloc (which slows allocations down) and to log the records to
+stderr, or ERICA_PROFILE_LOG=<path> to append them to a file. tracemalloc
+counts the whole process, so while it is on, sections of concurrent
+sessions run one at a time; otherwise one session's allocations would show
+up in another's section.
+"""
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROFILE_ENV = 'ERICA_PROFILE'
+PROFILE_LOG_ENV = 'ERICA_PROFILE_LOG'
+
+logger = logging.getLogger('erica.profile')
+
+# Held by each memory-tracking section; reentrant so one thread's sections cannot block each other
+_memory_lock = threading.RLock()
+
+
+def enabled():
+    return os.environ.get(PROFILE_ENV, '') not in ('', '0')
+
+
+def configure_log():
+    """Send profile records to ERICA_PROFILE_LOG, or to stderr when profiling is enabled."""
+    path = os.environ.get(PROFILE_LOG_ENV)
+    if path:
+        handler = logging.FileHandler(path)
+    elif enabled():
+        handler = logging.StreamHandler()
+    else:
+        return
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def max_rss():
+    """Peak resident memory of the process in bytes, or None where it is not available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class SectionStats:
+    """Process-wide count, total and worst time of each section."""
+
+    def __init__(self):
+        self._sections = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            count, total, worst = self._sections.get(name, (0, 0.0, 0.0))
+            self._sections[name] = (count + 1, total + seconds, max(worst, seconds))
+
+    def summary(self):
+        """One row per section, slowest total first."""
+        with self._lock:
+            rows = [{'section': name, 'count': count, 'total_seconds': total, 'mean_seconds': total / count,
+                     'max_seconds': worst} for name, (count, total, worst) in self._sections.items()]
+        return sorted(rows, key=lambda row: row['total_seconds'], reverse=True)
+
+
+class Profiler:
+    """Timings, and optionally memory, of the sections of one rerun."""
+
+    def __init__(self, track_memory=False, stats=None):
+        self.run_id = uuid.uuid4().hex[:8]
+        self.track_memory = track_memory
+        self.stats = stats
+        self.sections = []
+        if track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def section(self, name):
+        """Time the enclosed block as one section; sections should not nest."""
+        with _memory_lock if self.track_memory else contextlib.nullcontext():
+            if self.track_memory:
+                tracemalloc.reset_peak()
+                memory_before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                record = {'run': self.run_id, 'section': name, 'seconds': round(time.perf_counter() - start, 6)}
+                if self.track_memory:
+                    memory, peak = tracemalloc.get_traced_memory()
+                    record['memory_delta'] = memory - memory_before
+                    record['memory_peak'] = peak - memory_before
+                self.sections.append(record)
+                if self.stats is not None:
+                    self.stats.add(name, record['seconds'])
+                logger.info(json.dumps(record))
+
+    def total_seconds(self):
+        return sum(record['seconds'] for record in self.sections)
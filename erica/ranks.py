@@ -0,0 +1,245 @@
+"""Percentile ranks of customers within their peer groups.
+
+For every peer group the tabs benchmark against (location and segment,
+location, segment and customer group, and the whole portfolio), each
+score's values are kept sorted, with all groups laid end to end in one
+array per score. A customer's percentile rank is then two binary searches
+in their group's slice. Like the box plots, a group holds the rows of every
+quarter.
+
+When a quarter is appended to the store, its rows are merged into the
+sorted arrays of the previous version instead of sorting everything again.
+
+    python -m erica.ranks 17582714.2857
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from erica.index import CustomerIndex
+from erica.peers import ALL
+from erica.scoring import SCORE_COLUMNS
+from erica.store import open_store, replacing
+
+RANK_KEYS = ['CUSTOMER_LOCATION', 'CUSTOMER_SEGMENT', 'CUSTOMER_GROUP']
+
+# Peer groups with ranks; the keys left out are rolled up
+RANK_SETS = [RANK_KEYS, ['CUSTOMER_LOCATION', 'CUSTOMER_SEGMENT'], []]
+
+
+def percentile_rank(sorted_values, value):
+    """Percent of values below `value`, counting ties as half below (scipy's kind='mean')."""
+    if len(sorted_values) == 0:
+        return None
+    below = np.searchsorted(sorted_values, value, side='left')
+    not_above = np.searchsorted(sorted_values, value, side='right')
+    return 100 * (below + not_above) / (2 * len(sorted_values))
+
+
+def frame_percentiles(frame, scores):
+    """Percentile rank of each score in SCORE_COLUMNS within an ad hoc group of peers, or None."""
+    if len(frame) == 0:
+        return None
+    return {column: percentile_rank(np.sort(frame[column].to_numpy(dtype=np.float32)), np.float32(scores[column]))
+            for column in SCORE_COLUMNS}
+
+
+def ordinal(rank):
+    """'37th' for a percentile rank of 37.2."""
+    rank = int(round(rank))
+    suffix = 'th' if 10 <= rank % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(rank % 10, 'th')
+    return f'{rank}{suffix}'
+
+
+def rank_frame(score_store, positions=None):
+    """Rank keys and scores of the store's rows, or of the rows at `positions`."""
+    table = score_store.table
+    if positions is not None:
+        table = table.take(pa.array(positions, type=pa.int64()))
+    return table.select(RANK_KEYS + SCORE_COLUMNS).to_pandas()
+
+
+def _cell_key(location, segment, group):
+    # Segments are stored as int8 tiers; JSON and lookups use plain ints
+    return (location, segment if segment == ALL else int(segment), group)
+
+
+def _memberships(frame, cells):
+    """Cell id of each row in each rank set, adding cells not seen before; -1 where a key is missing."""
+    memberships = []
+    for keys in RANK_SETS:
+        ids = np.full(len(frame), -1, dtype=np.int64)
+        if keys:
+            complete = frame[keys].notna().all(axis=1).to_numpy()
+            grouped = frame.loc[complete, keys].groupby(keys, sort=True, observed=True)
+            codes, groups = grouped.ngroup().to_numpy(), grouped.size().index
+        else:
+            complete, codes, groups = np.ones(len(frame), dtype=bool), np.zeros(len(frame), dtype=np.int64), [()]
+        cell_ids = []
+        for group in groups:
+            full = dict(zip(keys, group))
+            cell = _cell_key(*(full.get(key, ALL) for key in RANK_KEYS))
+            cell_ids.append(cells.setdefault(cell, len(cells)))
+        ids[complete] = np.array(cell_ids, dtype=np.int64)[codes]
+        memberships.append(ids)
+    return np.concatenate(memberships)
+
+
+class RankIndex:
+    """Sorted score values of every peer group, for percentile rank lookups."""
+
+    def __init__(self, cells, offsets, values, version=None):
+        self.version = version
+        # Cell key -> cell id; cell c holds values[offsets[c]:offsets[c + 1]]
+        self.cells = cells
+        self.offsets = offsets
+        self.values = values
+
+    def __len__(self):
+        return len(self.cells)
+
+    @classmethod
+    def build(cls, frame, version=None):
+        cells = {}
+        memberships = _memberships(frame, cells)
+        return cls.empty(cells, version).insert_members(memberships, frame, version)
+
+    @classmethod
+    def empty(cls, cells, version=None):
+        values = {column: np.empty(0, dtype=np.float32) for column in SCORE_COLUMNS}
+        return cls(dict(cells), np.zeros(len(cells) + 1, dtype=np.int64), values, version)
+
+    def insert(self, frame, version=None):
+        """A new index with the rows of `frame` merged into their groups."""
+        cells = dict(self.cells)
+        memberships = _memberships(frame, cells)
+        index = RankIndex(cells, np.r_[self.offsets, np.full(len(cells) - len(self.cells), self.offsets[-1])],
+                          self.values, self.version)
+        return index.insert_members(memberships, frame, version)
+
+    def insert_members(self, memberships, frame, version=None):
+        # Each row joins one cell per rank set; rows without a cell are left out
+        member = memberships >= 0
+        cell_ids = memberships[member]
+        rows = np.tile(np.arange(len(frame)), len(RANK_SETS))[member]
+        counts = np.bincount(cell_ids, minlength=len(self.cells))
+        bounds = np.r_[0, np.cumsum(counts)]
+        # Group the new values by cell once; each cell's slice is then sorted on its own
+        by_cell = rows[np.argsort(cell_ids, kind='stable')]
+
+        values = {}
+        for column in SCORE_COLUMNS:
+            new = frame[column].to_numpy(dtype=np.float32)[by_cell]
+            for cell in np.flatnonzero(counts):
+                new[bounds[cell]:bounds[cell + 1]].sort()
+            if self.offsets[-1] == 0:
+                # Nothing to merge into: the sorted new values are the index
+                values[column] = new
+                continue
+            # Insert each cell's new values at their sorted places within its slice
+            at = np.empty(len(new), dtype=np.int64)
+            for cell in np.flatnonzero(counts):
+                start, end = self.offsets[cell], self.offsets[cell + 1]
+                chunk = slice(bounds[cell], bounds[cell + 1])
+                at[chunk] = start + np.searchsorted(self.values[column][start:end], new[chunk], side='right')
+            values[column] = np.insert(self.values[column], at, new)
+        offsets = self.offsets + bounds
+        return RankIndex(self.cells, offsets, values, version)
+
+    def group_values(self, column, location=ALL, segment=ALL, group=ALL):
+        """Sorted values of one peer group, or None when it has no members."""
+        cell = self.cells.get(_cell_key(location, segment, group))
+        if cell is None:
+            return None
+        return self.values[column][self.offsets[cell]:self.offsets[cell + 1]]
+
+    def percentiles(self, scores, location=ALL, segment=ALL, group=ALL):
+        """Percentile rank of each score in SCORE_COLUMNS (a mapping) within the peer group, or None."""
+        ranks = {}
+        for column in SCORE_COLUMNS:
+            values = self.group_values(column, location, segment, group)
+            if values is None or len(values) == 0:
+                return None
+            ranks[column] = percentile_rank(values, np.float32(scores[column]))
+        return ranks
+
+    def save(self, path):
+        table = pa.table({column: self.values[column] for column in SCORE_COLUMNS})
+        with replacing(path) as scratch:
+            feather.write_feather(table, scratch, compression='uncompressed')
+        cells = {'cells': [list(key) + [cell] for key, cell in self.cells.items()], 'offsets': self.offsets.tolist()}
+        with replacing(_cells_path(path)) as scratch, open(scratch, 'w') as f:
+            json.dump(cells, f)
+
+    @classmethod
+    def load(cls, path, version=None):
+        with open(_cells_path(path)) as f:
+            stored = json.load(f)
+        cells = {_cell_key(*entry[:3]): entry[3] for entry in stored['cells']}
+        # The sorted values are memory-mapped rather than read into memory
+        table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+        values = {column: table.column(column).to_numpy() for column in SCORE_COLUMNS}
+        return cls(cells, np.array(stored['offsets'], dtype=np.int64), values, version)
+
+
+def rank_path(store_dir, version):
+    return os.path.join(store_dir, f'ranks-{version}.arrow')
+
+
+def _cells_path(path):
+    return path[:-len('.arrow')] + '.json'
+
+
+def load_rank_index(score_store):
+    """Read the index for the store's version, building it when the data changed."""
+    path = rank_path(score_store.store_dir, score_store.version)
+    if os.path.exists(path) and os.path.exists(_cells_path(path)):
+        return RankIndex.load(path, version=score_store.version)
+    rank_index = RankIndex.build(rank_frame(score_store), version=score_store.version)
+    rank_index.save(path)
+    return rank_index
+
+
+def extend_rank_index(store_dir, version, new_version, rows):
+    """Save the index of `new_version` as `version`'s with `rows` added, if `version`'s was built."""
+    path = rank_path(store_dir, version)
+    if not (os.path.exists(path) and os.path.exists(_cells_path(path))):
+        return None
+    rank_index = RankIndex.load(path, version=version).insert(rows, version=new_version)
+    rank_index.save(rank_path(store_dir, new_version))
+    return rank_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="A customer's percentile ranks within their peer groups.")
+    parser.add_argument('customer_id', type=float)
+    parser.add_argument('--base-dir', default='.')
+    parser.add_argument('--store-dir', default=None)
+    args = parser.parse_args(argv)
+
+    score_store = open_store(args.base_dir, args.store_dir)
+    index = CustomerIndex(score_store.table.column('CUSTOMER_ID').to_numpy())
+    customer = rank_frame(score_store, [index.position(args.customer_id)]).iloc[0]
+    rank_index = load_rank_index(score_store)
+
+    groups = [('Portfolio', {}),
+              ('Location and segment', {'location': customer['CUSTOMER_LOCATION'],
+                                        'segment': customer['CUSTOMER_SEGMENT']}),
+              ('Location, segment and group', {'location': customer['CUSTOMER_LOCATION'],
+                                               'segment': customer['CUSTOMER_SEGMENT'],
+                                               'group': customer['CUSTOMER_GROUP']})]
+    for label, keys in groups:
+        ranks = rank_index.percentiles(customer, **keys) if all(pd.notna(v) for v in keys.values()) else None
+        if ranks is None:
+            print(f'{label}: no peers')
+            continue
+        print(f'{label}: ' + ', '.join(f'{column} {ordinal(rank)}' for column, rank in ranks.items()))
+
+
+if __name__ == '__main__':
+    main()
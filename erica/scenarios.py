@@ -0,0 +1,142 @@
+"""Portfolio-wide what-if scenarios for the loan recommendation.
+
+Applies the dashboard's Future Loans recommendation to every customer at
+once: size a loan from monthly income, cap the installment at a share of
+income, add the loan to the customer's balances and rescore them with the
+fitted scoring artifact. A scenario overrides the interest rate, tenor,
+income share, installment cap and resulting loan behavior.
+
+    python -m erica.scenarios --rate 0.08 --tenor 3 --top 100 --output boosts.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from erica.affordability import max_affordable_principal, monthly_installment
+from erica.scoring import FEATURES, RESILIENCE_SCORE, SCORE_COLUMNS, feature_matrix, load_store_model
+from erica.store import open_store, write_frame
+
+
+class Scenario:
+    """Parameters of one what-if loan offer; defaults match the dashboard."""
+
+    def __init__(self, name='default', interest_rate=0.06, tenor_years=5, income_share=0.15,
+                 max_installment_share=0.2, loan_behavior=4, compounding_periods=12):
+        self.name = name
+        self.interest_rate = interest_rate
+        self.tenor_years = tenor_years
+        self.income_share = income_share
+        self.max_installment_share = max_installment_share
+        # Code or label of the loan behavior after taking the loan; None keeps the current one
+        self.loan_behavior = loan_behavior
+        self.compounding_periods = compounding_periods
+
+
+DEFAULT_SCENARIO = Scenario()
+
+
+def recommend_loans(income, scenario=DEFAULT_SCENARIO):
+    """Recommended loan amount and monthly installment for each income."""
+    income = np.asarray(income, dtype=np.float64)
+    periods = scenario.compounding_periods
+    loan = np.round(income * scenario.income_share * 12 * scenario.tenor_years, -1)
+    installment = np.round(monthly_installment(loan, scenario.interest_rate, scenario.tenor_years, periods), -1)
+
+    # Shrink loans whose installment exceeds the cap to the largest affordable one
+    over_cap = installment > income * scenario.max_installment_share
+    capped_loan = max_affordable_principal(income, scenario.max_installment_share, scenario.interest_rate,
+                                           scenario.tenor_years, periods)
+    loan = np.where(over_cap, capped_loan, loan)
+    installment = np.where(over_cap, monthly_installment(loan, scenario.interest_rate, scenario.tenor_years,
+                                                         periods), installment)
+    return loan, installment
+
+
+def apply_loan(table, loan, installment, loan_behavior=None):
+    """Customer rows adjusted for taking the loan."""
+    adjusted = table.copy()
+    adjusted['TOTAL_BALANCE'] = adjusted['TOTAL_BALANCE'] + loan  # Increase liquidity
+    adjusted['CURRENT_MONTH_BILLING'] = adjusted['CURRENT_MONTH_BILLING'] + installment  # Add loan installment
+    adjusted['LOAN_AMOUNT'] = adjusted['LOAN_AMOUNT'] + loan  # New loan amount
+    if loan_behavior is not None:
+        adjusted['LOAN_BEHAVIOR'] = loan_behavior
+    return adjusted
+
+
+def apply_loan_matrix(matrix, loan, installment, loan_behavior=None):
+    """Same adjustment as apply_loan, on a FEATURES matrix."""
+    adjusted = matrix.copy()
+    adjusted[:, FEATURES.index('TOTAL_BALANCE')] += loan
+    adjusted[:, FEATURES.index('CURRENT_MONTH_BILLING')] += installment
+    adjusted[:, FEATURES.index('LOAN_AMOUNT')] += loan
+    if loan_behavior is not None:
+        adjusted[:, FEATURES.index('LOAN_BEHAVIOR')] = loan_behavior
+    return adjusted
+
+
+def run_scenario(table, model, scenario=DEFAULT_SCENARIO):
+    """Recommended loan and score changes for every customer row under one scenario."""
+    loan, installment = recommend_loans(table['MONTHLY_INCOME'].to_numpy(), scenario)
+    loan_behavior = scenario.loan_behavior
+    if isinstance(loan_behavior, str):
+        loan_behavior = model.mappings['LOAN_BEHAVIOR'][loan_behavior]
+
+    matrix = feature_matrix(table)
+    current = model.score_array(matrix)
+    adjusted = model.score_array(apply_loan_matrix(matrix, loan, installment, loan_behavior))
+
+    result = pd.DataFrame({
+        'CUSTOMER_ID': table['CUSTOMER_ID'].to_numpy(),
+        'QUARTER': table['QUARTER'].to_numpy(),
+        'SCENARIO': scenario.name,
+        'RECOMMENDED_LOAN_AMOUNT': loan,
+        'MONTHLY_INSTALLMENT': installment,
+        RESILIENCE_SCORE: current[:, -1],
+        'NEW_' + RESILIENCE_SCORE: adjusted[:, -1],
+    })
+    for i, column in enumerate(SCORE_COLUMNS):
+        result[column.replace('_Score', '_Boost')] = adjusted[:, i] - current[:, i]
+    return result
+
+
+def run_scenarios(table, model, scenarios):
+    """Stack the results of several scenarios, one block per scenario."""
+    return pd.concat([run_scenario(table, model, scenario) for scenario in scenarios], ignore_index=True)
+
+
+def rank_by_boost(results, top=None):
+    """Customers ordered by resilience boost, largest first."""
+    ranked = results.sort_values('Resilience_Boost', ascending=False, kind='stable')
+    return ranked if top is None else ranked.head(top)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply a what-if loan scenario to every customer.')
+    parser.add_argument('--name', default=DEFAULT_SCENARIO.name)
+    parser.add_argument('--rate', type=float, default=DEFAULT_SCENARIO.interest_rate, help='Annual interest rate')
+    parser.add_argument('--tenor', type=float, default=DEFAULT_SCENARIO.tenor_years, help='Loan tenor in years')
+    parser.add_argument('--share', type=float, default=DEFAULT_SCENARIO.income_share,
+                        help='Share of monthly income used to size the loan')
+    parser.add_argument('--max-installment-share', type=float, default=DEFAULT_SCENARIO.max_installment_share)
+    parser.add_argument('--loan-behavior', default=str(DEFAULT_SCENARIO.loan_behavior),
+                        help="Loan behavior code or label after the loan, or 'keep'")
+    parser.add_argument('--top', type=int, default=None, help='Only keep the customers with the largest boosts')
+    parser.add_argument('--output', default='scenario_boosts.csv')
+    args = parser.parse_args(argv)
+
+    loan_behavior = args.loan_behavior
+    if loan_behavior == 'keep':
+        loan_behavior = None
+    elif loan_behavior.isdigit():
+        loan_behavior = int(loan_behavior)
+    scenario = Scenario(args.name, args.rate, args.tenor, args.share, args.max_installment_share, loan_behavior)
+
+    score_store = open_store()
+    results = rank_by_boost(run_scenario(score_store.unscaled, load_store_model(score_store), scenario), args.top)
+    write_frame(results, args.output)
+    print(f'Scored {len(results):,} customers under scenario {scenario.name!r} -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
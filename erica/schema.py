@@ -0,0 +1,92 @@
+"""Compact column types for the customer tables.
+
+Locations, quarters and customer groups are held as categoricals, small
+codes (SEC, EDUCATION, GENDER, indicators, segment tiers, loan behavior)
+as int8, and derived scores and z-scores as float32. Every customer also
+gets a dense int32 surrogate key, CUSTOMER_KEY, so joins and group-bys run
+on integers instead of float CUSTOMER_IDs.
+
+Amounts and CUSTOMER_ID itself stay float64: float32 keeps only about
+seven significant digits, which loses centavos on large balances and
+merges IDs like 17582714.2857 with their neighbours.
+"""
+import numpy as np
+import pandas as pd
+
+# Bumped whenever the stored column types change, so older stores are rebuilt
+SCHEMA_VERSION = 2
+
+KEY_COLUMN = 'CUSTOMER_KEY'
+
+# Scaled copies of features are stored next to the raw values with this suffix
+SCALED_SUFFIX = '_Z'
+
+# Concept and resilience scores are named like 'Financial Health_Score'
+SCORE_SUFFIX = '_Score'
+
+CATEGORY_COLUMNS = ['CUSTOMER_LOCATION', 'QUARTER', 'CUSTOMER_GROUP']
+
+CODE_COLUMNS = [
+    'SEC', 'DIGITAL_INDICATOR', 'GENDER', 'EDUCATION', 'AUTO_LOAN_INDICATOR', 'HOUSING_LOAN_INDICATOR',
+    'SAVINGS_ACCOUNT_INDICATOR', 'CUSTOMER_SEGMENT', 'LOAN_BEHAVIOR',
+]
+
+
+def _is_float32(column):
+    return column.endswith((SCORE_SUFFIX, SCALED_SUFFIX))
+
+
+def _code_values(values):
+    # int8 when every value is a whole number in range; float32 keeps missing codes
+    if values.notna().all():
+        as_int = values.to_numpy()
+        if (as_int == np.round(as_int)).all() and as_int.min() >= -128 and as_int.max() <= 127:
+            return values.astype(np.int8)
+    return values.astype(np.float32)
+
+
+def compact(frame):
+    """The table with the compact column types.
+
+    Columns the schema does not cover, and code columns still holding
+    labels rather than numeric codes, keep their types.
+    """
+    columns = {}
+    for column in frame.columns:
+        values = frame[column]
+        if column in CATEGORY_COLUMNS and not isinstance(values.dtype, pd.CategoricalDtype):
+            columns[column] = values.astype('category')
+        elif column in CODE_COLUMNS and pd.api.types.is_numeric_dtype(values) and len(values):
+            columns[column] = _code_values(values)
+        elif _is_float32(column) and pd.api.types.is_float_dtype(values):
+            columns[column] = values.astype(np.float32)
+    return frame.assign(**columns) if columns else frame
+
+
+def customer_keys(customer_ids, known=None):
+    """int32 surrogate keys for CUSTOMER_IDs.
+
+    IDs in `known` (keys indexed by CUSTOMER_ID) keep their key; other IDs
+    are numbered in ID order after the largest known key.
+    """
+    customer_ids = pd.Series(customer_ids)
+    keys = pd.Series(-1, index=customer_ids.index, dtype=np.int64)
+    start = 0
+    if known is not None and len(known):
+        keys = customer_ids.map(known).fillna(-1).astype(np.int64)
+        start = int(known.max()) + 1
+    new = keys.to_numpy() < 0
+    if new.any():
+        codes, _ = pd.factorize(customer_ids[new], sort=True)
+        keys[new] = start + codes
+    return keys.to_numpy().astype(np.int32)
+
+
+def key_lookup(frame):
+    """CUSTOMER_KEY of each CUSTOMER_ID in a keyed table, for extending it with customer_keys."""
+    return frame.drop_duplicates('CUSTOMER_ID').set_index('CUSTOMER_ID')[KEY_COLUMN]
+
+
+def memory_usage(frame):
+    """Bytes held by a table, counting the strings of object columns."""
+    return int(frame.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,308 @@
+"""Batch resilience scoring.
+
+Mirrors the score definition from the scoring notebook: every feature is
+z-scored against the population, each concept score is the mean of its
+features' z-scores, the resilience score is the equal-weight mean of the
+concept scores, and all five scores are min-max scaled to 0-1.
+
+Fit the population statistics once and reuse them:
+
+    python -m erica.scoring fit "Resilience Score Analysis Unscaled.csv" scoring_model.json
+    python -m erica.scoring score scoring_model.json customers.csv scores.csv
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from erica.store import read_frame, replacing, write_frame
+
+# Features kept for each concept after the correlation-based selection
+CONCEPTS = {
+    "Financial Health": [
+        'TRANSACTION_AMOUNT_DEBIT',
+        'MONTHLY_INCOME',
+        'TOTAL_BALANCE',
+        'CURRENT_MONTH_BILLING'
+    ],
+    "Credit Reliability": [
+        'AUTO_LOAN_INDICATOR',
+        'HOUSING_LOAN_INDICATOR',
+        'SAVINGS_ACCOUNT_INDICATOR',
+        'DIGITAL_INDICATOR',
+        'REVOLVING_BALANCE',
+        'LOAN_BEHAVIOR',
+        'LOAN_AMOUNT'
+    ],
+    "Customer Engagement": [
+        'BANK_TENURE', 'CUSTOMER_SEGMENT', 'TRANSACTION_AMOUNT_IBFT',
+        'TRANSACTION_AMOUNT_CC'
+    ],
+    "Socioeconomic Stability": [
+        'SEC', 'GENDER', 'EDUCATION'
+    ]
+}
+
+# Encodings of the categorical source columns, as used for the exported scores
+CATEGORY_MAPPINGS = {
+    'DIGITAL_INDICATOR': {'DIGITAL': 1, 'TRADITIONAL': 0},
+    'LOAN_BEHAVIOR': {'Amortization Past Due': 1, 'Items for litigation': 2, 'Current': 3, 'Principal Past Due': 4},
+    'CUSTOMER_SEGMENT': {'Tier 1': 1, 'Tier 2': 2, 'Tier 3': 3, 'Tier 4': 4, 'Tier 5': 5, 'Tier 6': 6},
+    'SEC': {'E': 1, 'D': 2, 'C2': 3, 'C1': 4, 'B2': 5, 'B1': 6, 'A': 7},
+    'GENDER': {'MALE': 1, 'FEMALE': 0},
+    'EDUCATION': {'LOW': 1, 'MID': 2, 'HIGH': 3},
+}
+
+# Bumped whenever the artifact layout or score definition changes
+ARTIFACT_VERSION = 1
+
+# Fitted statistics are kept next to the score store under this name
+MODEL_FILE = 'scoring.json'
+
+FEATURES = [feature for features in CONCEPTS.values() for feature in features]
+CONCEPT_SCORES = [f'{concept}_Score' for concept in CONCEPTS]
+RESILIENCE_SCORE = 'Resilience_Score'
+SCORE_COLUMNS = CONCEPT_SCORES + [RESILIENCE_SCORE]
+
+# Resilience scores below these bounds are high and moderate risk
+HIGH_RISK_BELOW = -0.5
+MODERATE_RISK_BELOW = 0.5
+RISK_LEVELS = ['High Risk', 'Moderate Risk', 'Low Risk']
+
+# Concept scores below these are flagged as weak on the dashboard
+FACTOR_THRESHOLDS = {
+    'Financial Health_Score': 0.3,  # Below 0.3 considered low for financial health
+    'Credit Reliability_Score': 0.4,  # Below 0.4 considered low for credit reliability
+    'Customer Engagement_Score': 0.5,  # Below 0.5 considered low engagement
+    'Socioeconomic Stability_Score': 0.6  # Below 0.6 suggests low socioeconomic stability
+}
+
+
+def feature_matrix(table, features=FEATURES):
+    """Features as an (n, len(features)) float array.
+
+    Accepts a DataFrame, a mapping of column name to array, or an array whose
+    columns are already in FEATURES order.
+    """
+    if isinstance(table, np.ndarray):
+        matrix = np.asarray(table, dtype=np.float64)
+        if matrix.ndim != 2 or matrix.shape[1] != len(features):
+            raise ValueError(f'Expected an array with {len(features)} feature columns')
+        return matrix
+    if isinstance(table, pd.DataFrame):
+        return table[list(features)].to_numpy(dtype=np.float64)
+    return np.column_stack([np.asarray(table[feature], dtype=np.float64) for feature in features])
+
+
+def classify_risk(resilience_score):
+    """Risk tier shown on the dashboard for a resilience score."""
+    if resilience_score < HIGH_RISK_BELOW:
+        return 'High Risk'
+    elif resilience_score < MODERATE_RISK_BELOW:
+        return 'Moderate Risk'
+    else:
+        return 'Low Risk'
+
+
+def risk_levels(resilience_scores):
+    """Index into RISK_LEVELS for each resilience score, as classify_risk assigns them."""
+    bounds = [HIGH_RISK_BELOW, MODERATE_RISK_BELOW]
+    return np.searchsorted(bounds, np.asarray(resilience_scores), side='right').astype(np.int8)
+
+
+def encode_categories(frame, mappings=CATEGORY_MAPPINGS):
+    """Replace categorical labels with their numeric codes; numeric columns pass through."""
+    frame = frame.copy()
+    for column, mapping in mappings.items():
+        if column in frame and not pd.api.types.is_numeric_dtype(frame[column]):
+            frame[column] = frame[column].map(mapping)
+    return frame
+
+
+def concept_weights(features=FEATURES, concepts=CONCEPTS):
+    """(features, concepts) matrix that averages each concept's z-scores."""
+    weights = np.zeros((len(features), len(concepts)))
+    for j, concept_features in enumerate(concepts.values()):
+        for feature in concept_features:
+            weights[features.index(feature), j] = 1 / len(concept_features)
+    return weights
+
+
+class ScoringModel:
+    """Fitted population statistics for the resilience score.
+
+    `mean` and `std` are per feature (population std, as scipy's zscore);
+    `score_min` and `score_max` are the raw bounds of the four concept
+    scores followed by the resilience score, used for min-max scaling.
+    `count` is the number of rows the statistics cover, which lets new
+    rows be folded in without the old ones. `mappings` are the category
+    encodings the features were fitted with, and `source` identifies the
+    data the statistics were fitted on.
+    """
+
+    def __init__(self, mean, std, score_min, score_max, count=None, mappings=None, source=None):
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.std = np.asarray(std, dtype=np.float64)
+        self.score_min = np.asarray(score_min, dtype=np.float64)
+        self.score_max = np.asarray(score_max, dtype=np.float64)
+        self.count = count
+        self.mappings = mappings or CATEGORY_MAPPINGS
+        self.source = source
+        self.weights = concept_weights()
+
+    @classmethod
+    def fit(cls, table):
+        matrix = feature_matrix(table)
+        mean = matrix.mean(axis=0)
+        std = matrix.std(axis=0)
+        raw = _raw_scores(matrix, mean, std, concept_weights())
+        return cls(mean, std, raw.min(axis=0), raw.max(axis=0), count=len(matrix))
+
+    def update(self, table):
+        """Fold new rows into the population statistics.
+
+        Means and variances are merged with the pairwise update of Chan et
+        al., so earlier rows are not needed. The score bounds are widened to
+        cover the new rows' raw scores under the updated statistics.
+        """
+        if self.count is None:
+            raise ValueError('Scoring artifact has no row count; refit it before updating')
+        matrix = feature_matrix(table)
+        n_old, n_new = self.count, len(matrix)
+        if n_new == 0:
+            return self
+        n = n_old + n_new
+        new_mean = matrix.mean(axis=0)
+        delta = new_mean - self.mean
+        m2 = self.std ** 2 * n_old + matrix.var(axis=0) * n_new + delta ** 2 * n_old * n_new / n
+        self.mean = self.mean + delta * n_new / n
+        self.std = np.sqrt(m2 / n)
+        self.count = n
+        self.extend_bounds(self.raw_scores(matrix))
+        return self
+
+    def encode(self, frame):
+        return encode_categories(frame, self.mappings)
+
+    def extend_bounds(self, raw):
+        self.score_min = np.minimum(self.score_min, raw.min(axis=0))
+        self.score_max = np.maximum(self.score_max, raw.max(axis=0))
+
+    def refit_bounds(self, table):
+        """Recompute the score bounds exactly over a whole table."""
+        raw = self.raw_scores(table)
+        self.score_min, self.score_max = raw.min(axis=0), raw.max(axis=0)
+        return self
+
+    def raw_scores(self, table):
+        """Unscaled concept and resilience scores as an (n, 5) array."""
+        return _raw_scores(feature_matrix(table), self.mean, self.std, self.weights)
+
+    def scale(self, raw):
+        return (raw - self.score_min) / (self.score_max - self.score_min)
+
+    def score_array(self, table):
+        """Scaled concept and resilience scores as an (n, 5) array."""
+        return self.scale(self.raw_scores(table))
+
+    def score(self, table):
+        """Scaled scores as a DataFrame with SCORE_COLUMNS."""
+        index = table.index if isinstance(table, pd.DataFrame) else None
+        return pd.DataFrame(self.score_array(table), columns=SCORE_COLUMNS, index=index)
+
+    def to_dict(self):
+        return {
+            'artifact_version': ARTIFACT_VERSION,
+            'source': self.source,
+            'features': FEATURES,
+            'mean': self.mean.tolist(),
+            'std': self.std.tolist(),
+            'scores': SCORE_COLUMNS,
+            'score_min': self.score_min.tolist(),
+            'score_max': self.score_max.tolist(),
+            'count': self.count,
+            'mappings': self.mappings,
+        }
+
+    @classmethod
+    def from_dict(cls, artifact):
+        if (artifact.get('artifact_version') != ARTIFACT_VERSION or artifact['features'] != FEATURES
+                or artifact['scores'] != SCORE_COLUMNS):
+            raise ValueError('Scoring artifact was fitted with a different score definition')
+        return cls(artifact['mean'], artifact['std'], artifact['score_min'], artifact['score_max'],
+                   count=artifact['count'], mappings=artifact['mappings'], source=artifact['source'])
+
+    def save(self, path):
+        # Replaced in one step, as other processes may be reading the artifact
+        with replacing(path) as scratch, open(scratch, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def load_store_model(score_store):
+    """The fitted artifact for a score store, fitting and saving it on first use.
+
+    The artifact is refitted when the store has been rebuilt from new source data.
+    """
+    path = os.path.join(score_store.store_dir, MODEL_FILE)
+    if os.path.exists(path):
+        try:
+            model = ScoringModel.load(path)
+            if model.source == score_store.manifest['source']:
+                return model
+        except (ValueError, KeyError):
+            pass
+    model = ScoringModel.fit(score_store.unscaled)
+    save_store_model(score_store, model)
+    return model
+
+
+def save_store_model(score_store, model):
+    model.source = score_store.manifest['source']
+    model.save(os.path.join(score_store.store_dir, MODEL_FILE))
+
+
+def _raw_scores(matrix, mean, std, weights):
+    concept_scores = ((matrix - mean) / std) @ weights
+    return np.column_stack([concept_scores, concept_scores.mean(axis=1)])
+
+
+def score_table(table, model=None):
+    """Score a whole table, fitting the population statistics when no model is given."""
+    model = model or ScoringModel.fit(table)
+    return model.score(table)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fit or apply the ERICA resilience score.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fit_parser = commands.add_parser('fit', help='Fit population statistics from a customer table')
+    fit_parser.add_argument('table')
+    fit_parser.add_argument('model')
+
+    score_parser = commands.add_parser('score', help='Score a customer table with a fitted model')
+    score_parser.add_argument('model')
+    score_parser.add_argument('table')
+    score_parser.add_argument('output')
+    args = parser.parse_args(argv)
+
+    table = read_frame(args.table)
+    if args.command == 'fit':
+        ScoringModel.fit(table).save(args.model)
+        print(f'Fitted {len(FEATURES)} features on {len(table):,} rows -> {args.model}')
+    else:
+        scores = ScoringModel.load(args.model).score(table)
+        output = table.drop(columns=[c for c in SCORE_COLUMNS if c in table]).join(scores)
+        write_frame(output, args.output)
+        print(f'Scored {len(output):,} rows -> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
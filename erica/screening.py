@@ -0,0 +1,154 @@
+"""Portfolio-wide screening by risk level, weak factors and peer keys.
+
+Every customer's latest row is classified once: a risk level from the
+resilience score, and a weak flag for each concept score below its
+dashboard threshold. Each flag, and each location, segment and group
+value, is kept as a packed bitmap over the customers, so a screen like
+"High Risk Tier 3 customers in NCR with low Credit Reliability" is a few
+bitwise operations, and only the matching rows are ever materialized.
+
+    python -m erica.screening --risk "High Risk" --segment 3 --weak "Credit Reliability_Score"
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from erica.scoring import FACTOR_THRESHOLDS, RESILIENCE_SCORE, RISK_LEVELS, SCORE_COLUMNS, risk_levels
+from erica.store import open_store, write_frame
+
+DIMENSIONS = ['CUSTOMER_LOCATION', 'CUSTOMER_SEGMENT', 'CUSTOMER_GROUP']
+RISK_COLUMN = 'RISK_LEVEL'
+
+# Set bits in each byte value, for numpy releases before 2.0, which have no bitwise_count
+_BYTE_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def _pack(mask):
+    return np.packbits(mask)
+
+
+def _popcount(bits):
+    if hasattr(np, 'bitwise_count'):
+        return int(np.bitwise_count(bits).sum())
+    return int(_BYTE_BITS[bits].sum())
+
+
+def _as_list(values):
+    if values is None:
+        return []
+    if isinstance(values, (list, tuple, set)):
+        return list(values)
+    return [values]
+
+
+class Screener:
+    """Bitmaps of risk levels, weak factors and peer keys over each customer's latest row."""
+
+    def __init__(self, score_store):
+        self.version = score_store.version
+        table = score_store.table
+
+        # The store is ordered newest quarter first, so a customer's first row is their latest
+        ids = table.column('CUSTOMER_ID').to_numpy()
+        latest = np.flatnonzero(~pd.Index(ids).duplicated())
+        customers = table.select(['CUSTOMER_ID', 'QUARTER'] + DIMENSIONS + SCORE_COLUMNS).take(latest).to_pandas()
+        levels = risk_levels(customers[RESILIENCE_SCORE].to_numpy())
+        customers[RISK_COLUMN] = pd.Categorical.from_codes(levels, RISK_LEVELS)
+        self.customers = customers
+        self.size = len(customers)
+
+        self.bitmaps = {}
+        for level, name in enumerate(RISK_LEVELS):
+            self.bitmaps[(RISK_COLUMN, name)] = _pack(levels == level)
+        for factor, threshold in FACTOR_THRESHOLDS.items():
+            self.bitmaps[('weak', factor)] = _pack(customers[factor].to_numpy() < threshold)
+        for dimension in DIMENSIONS:
+            codes, values = pd.factorize(customers[dimension])
+            for code, value in enumerate(values):
+                self.bitmaps[(dimension, value)] = _pack(codes == code)
+        self._all = _pack(np.ones(self.size, dtype=bool))
+
+    def values(self, dimension):
+        """Values of a dimension (or RISK_LEVEL) that have a bitmap."""
+        return sorted(value for key, value in self.bitmaps if key == dimension)
+
+    def _any(self, key, values):
+        # Union of the bitmaps of several values of one dimension; no bitmap for an unknown value
+        bits = np.zeros_like(self._all)
+        for value in values:
+            bitmap = self.bitmaps.get((key, value))
+            if bitmap is not None:
+                bits |= bitmap
+        return bits
+
+    def mask(self, risk=None, weak=None, location=None, segment=None, group=None):
+        """Packed bitmap of the customers matching every given filter.
+
+        Each filter takes one value or a list of values, any of which may
+        match; `weak` lists concept scores that must all be below their
+        thresholds.
+        """
+        bits = self._all.copy()
+        filters = [(RISK_COLUMN, risk), ('CUSTOMER_LOCATION', location), ('CUSTOMER_SEGMENT', segment),
+                   ('CUSTOMER_GROUP', group)]
+        for key, values in filters:
+            values = _as_list(values)
+            if values:
+                bits &= self._any(key, values)
+        for factor in _as_list(weak):
+            bits &= self.bitmaps[('weak', factor)]
+        return bits
+
+    def count(self, **filters):
+        """Number of customers matching the filters, counted on the bitmap."""
+        return _popcount(self.mask(**filters))
+
+    def positions(self, **filters):
+        return np.flatnonzero(np.unpackbits(self.mask(**filters), count=self.size))
+
+    def select(self, **filters):
+        """The matching customers' latest rows, with their risk level and weak factors."""
+        positions = self.positions(**filters)
+        rows = self.customers.iloc[positions].reset_index(drop=True)
+        weak = np.column_stack([rows[factor].to_numpy() < threshold
+                                for factor, threshold in FACTOR_THRESHOLDS.items()])
+        names = np.array([factor.replace('_Score', '') for factor in FACTOR_THRESHOLDS], dtype=object)
+        rows['WEAK_FACTORS'] = [', '.join(names[flags]) for flags in weak]
+        return rows
+
+    def risk_counts(self, by=('CUSTOMER_LOCATION',), **filters):
+        """Customers per risk level for each combination of the `by` dimensions, among those matching the filters."""
+        rows = self.customers.iloc[self.positions(**filters)]
+        counts = rows.groupby(list(by) + [RISK_COLUMN], observed=False).size()
+        counts = counts.unstack(RISK_COLUMN, fill_value=0)
+        counts.columns = list(counts.columns)
+        return counts[counts.sum(axis=1) > 0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Screen the ERICA portfolio by risk level and weak factors.')
+    parser.add_argument('--risk', nargs='+', default=None, choices=RISK_LEVELS)
+    parser.add_argument('--weak', nargs='+', default=None, choices=list(FACTOR_THRESHOLDS))
+    parser.add_argument('--location', nargs='+', default=None)
+    parser.add_argument('--segment', nargs='+', type=int, default=None, help='Segment tiers, e.g. 3')
+    parser.add_argument('--group', nargs='+', default=None)
+    parser.add_argument('--by', nargs='+', default=['CUSTOMER_LOCATION'], choices=DIMENSIONS,
+                        help='Dimensions of the risk level counts')
+    parser.add_argument('--output', default=None, help='Write the matching customers here')
+    parser.add_argument('--base-dir', default='.')
+    parser.add_argument('--store-dir', default=None)
+    args = parser.parse_args(argv)
+
+    screener = Screener(open_store(args.base_dir, args.store_dir))
+    filters = {'risk': args.risk, 'weak': args.weak, 'location': args.location, 'segment': args.segment,
+               'group': args.group}
+    print(screener.risk_counts(args.by, **filters).to_string())
+    matches = screener.select(**filters)
+    print(f'{len(matches):,} of {screener.size:,} customers match')
+    if args.output:
+        write_frame(matches, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+"""HTTP/JSON scoring service for the loan-origination system.
+
+Serves the dashboard's resilience score, risk tier, concept breakdown and
+Future Loans recommendation without Streamlit. Each worker process opens
+the score store once and keeps the scores and features it needs in memory;
+requests are answered from NumPy arrays, batches in one vectorized call.
+Concurrent single-customer requests are coalesced into such batches, and a
+newly published store version is swapped in without a restart.
+
+    python -m erica.service --port 8000 --workers 4
+
+    GET  /health
+    GET  /customers/{customer_id}/score
+    GET  /customers/{customer_id}/recommendation?interest_rate=0.08&tenor_years=3
+    POST /score/batch            {"customer_ids": [...]}
+    POST /recommendations/batch  {"customer_ids": [...], "scenario": {"interest_rate": 0.08}}
+"""
+import argparse
+import asyncio
+import contextlib
+import math
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from erica.batching import COALESCE_WINDOW, RequestCoalescer
+from erica.index import CustomerIndex
+from erica.scenarios import DEFAULT_SCENARIO, Scenario, apply_loan_matrix, recommend_loans
+from erica.scoring import (CATEGORY_MAPPINGS, CONCEPTS, FEATURES, SCORE_COLUMNS, classify_risk, feature_matrix,
+                           load_store_model)
+from erica.store import StoreRegistry
+
+# Largest number of customers accepted in one batch request
+MAX_BATCH_SIZE = 10000
+
+# Scenario parameters a request may override
+SCENARIO_PARAMETERS = ['interest_rate', 'tenor_years', 'income_share', 'max_installment_share', 'loan_behavior']
+
+
+class RequestError(ValueError):
+    """A request the service cannot answer; carries the HTTP status to return."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _number(value):
+    # JSON has no NaN
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def _score(value):
+    # Scores are stored as float32: serve the shortest decimal that reads back as the stored value,
+    # which agrees with the published score to its ~7 significant digits instead of showing widening noise
+    return _number(str(np.float32(value)))
+
+
+class ScoringService:
+    """Scores and loan recommendations for the customers in a score store."""
+
+    def __init__(self, score_store, model=None):
+        self.version = score_store.version
+        self.model = model or load_store_model(score_store)
+        self.index = CustomerIndex(score_store.table.column('CUSTOMER_ID').to_numpy(), version=self.version)
+
+        # Only the columns the responses need, as contiguous arrays
+        scaled = score_store.scaled
+        self.customer_ids = scaled['CUSTOMER_ID'].to_numpy()
+        self.quarters = scaled['QUARTER'].to_numpy(dtype=object)
+        self.scores = scaled[SCORE_COLUMNS].to_numpy(dtype=np.float32)
+        self.features = feature_matrix(score_store.unscaled)
+
+    def __len__(self):
+        return len(self.customer_ids)
+
+    def lookup(self, customer_ids):
+        """Latest row position of each customer and the IDs not in the store."""
+        try:
+            positions = self.index.latest_positions(customer_ids)
+        except (TypeError, ValueError):
+            raise RequestError('customer_ids must be numeric customer IDs')
+        missing = [customer_id for customer_id, position in zip(customer_ids, positions) if position < 0]
+        return positions[positions >= 0], missing
+
+    def _each(self, customer_ids, results_for):
+        # Results aligned with customer_ids, None for unknown IDs
+        positions = self.index.latest_positions(customer_ids)
+        found = positions >= 0
+        results = iter(results_for(positions[found]))
+        return [next(results) if hit else None for hit in found]
+
+    def score_each(self, customer_ids):
+        """score() for each customer ID in order, None where the ID is unknown."""
+        return self._each(customer_ids, self.score)
+
+    def recommend_each(self, customer_ids, scenario=DEFAULT_SCENARIO):
+        """recommend() for each customer ID in order, None where the ID is unknown."""
+        return self._each(customer_ids, lambda positions: self.recommend(positions, scenario))
+
+    def score(self, positions):
+        """Score, risk tier and concept breakdown for each row position."""
+        results = []
+        for position in positions:
+            scores = self.scores[position]
+            results.append({
+                'customer_id': _number(self.customer_ids[position]),
+                'quarter': self.quarters[position],
+                'resilience_score': _score(scores[-1]),
+                'risk_level': classify_risk(scores[-1]),
+                'breakdown': {concept: _score(value) for concept, value in zip(CONCEPTS, scores[:-1])},
+            })
+        return results
+
+    def recommend(self, positions, scenario=DEFAULT_SCENARIO):
+        """Future Loans recommendation and its score change for each row position."""
+        matrix = self.features[positions]
+        income = matrix[:, FEATURES.index('MONTHLY_INCOME')]
+        loan, installment = recommend_loans(income, scenario)
+        loan_behavior = scenario.loan_behavior
+        if isinstance(loan_behavior, str):
+            if loan_behavior not in self.model.mappings['LOAN_BEHAVIOR']:
+                raise RequestError(f'Unknown loan behavior {loan_behavior!r}')
+            loan_behavior = self.model.mappings['LOAN_BEHAVIOR'][loan_behavior]
+        new_scores = self.model.score_array(apply_loan_matrix(matrix, loan, installment, loan_behavior))[:, -1]
+        current_scores = self.scores[positions, -1].astype(np.float64)
+        boosts = new_scores - current_scores
+
+        results = []
+        for i, position in enumerate(positions):
+            results.append({
+                'customer_id': _number(self.customer_ids[position]),
+                'quarter': self.quarters[position],
+                'monthly_income': _number(income[i]),
+                'recommended_loan_amount': _number(loan[i]),
+                'loan_duration_years': scenario.tenor_years,
+                'monthly_installment': _number(installment[i]),
+                'resilience_score': _score(current_scores[i]),
+                'new_resilience_score': _number(new_scores[i]),
+                'resilience_boost': _number(boosts[i]),
+            })
+        return results
+
+
+def _loan_behavior(value, mappings):
+    # 'keep' leaves each customer's loan behavior as it is; otherwise a label or code the model was fitted with
+    codes = mappings['LOAN_BEHAVIOR']
+    if value == 'keep':
+        return None
+    if isinstance(value, str) and value in codes:
+        return value
+    if isinstance(value, str) and value.isdigit():
+        value = int(value)
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value in codes.values():
+        return int(value)
+    raise RequestError(f'Unknown loan behavior {value!r}')
+
+
+def parse_scenario(parameters, mappings=CATEGORY_MAPPINGS):
+    """Scenario from request parameters, defaulting to the dashboard's.
+
+    `mappings` are the category encodings of the model the scenario is
+    scored with, which the loan behavior is checked against.
+    """
+    if not isinstance(parameters, dict):
+        raise RequestError('scenario must be an object')
+    unknown = set(parameters) - set(SCENARIO_PARAMETERS)
+    if unknown:
+        raise RequestError(f"Unknown scenario parameters: {', '.join(sorted(unknown))}")
+    values = {name: getattr(DEFAULT_SCENARIO, name) for name in SCENARIO_PARAMETERS}
+    try:
+        for name, value in parameters.items():
+            if name != 'loan_behavior':
+                values[name] = float(value)
+    except (TypeError, ValueError):
+        raise RequestError(f'Scenario parameter {name} must be a number')
+    if 'loan_behavior' in parameters:
+        values['loan_behavior'] = _loan_behavior(parameters['loan_behavior'], mappings)
+
+    # Out-of-range terms would price to NaN installments rather than fail
+    for name in SCENARIO_PARAMETERS:
+        if name != 'loan_behavior' and not math.isfinite(values[name]):
+            raise RequestError(f'Scenario parameter {name} must be finite')
+    if values['tenor_years'] <= 0:
+        raise RequestError('Scenario parameter tenor_years must be positive')
+    for name in ('interest_rate', 'income_share', 'max_installment_share'):
+        if values[name] < 0:
+            raise RequestError(f'Scenario parameter {name} must not be negative')
+    return Scenario('request', **values)
+
+
+def scenario_key(scenario):
+    """Hashable scenario parameters; requests with the same key share a batch."""
+    return tuple(getattr(scenario, name) for name in SCENARIO_PARAMETERS)
+
+
+def _customer_id(request):
+    try:
+        return float(request.path_params['customer_id'])
+    except ValueError:
+        raise RequestError('Customer IDs are numeric')
+
+
+async def _batch(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise RequestError('Request body must be JSON')
+    customer_ids = body.get('customer_ids') if isinstance(body, dict) else None
+    if not isinstance(customer_ids, list):
+        raise RequestError('Request body must contain a customer_ids list')
+    if len(customer_ids) > MAX_BATCH_SIZE:
+        raise RequestError(f'At most {MAX_BATCH_SIZE} customers per batch', status=413)
+    return body, customer_ids
+
+
+def _found(result, customer_id):
+    if result is None:
+        raise RequestError(f'Customer {customer_id} not found', status=404)
+    return JSONResponse(result)
+
+
+async def health(request):
+    state = request.app.state
+    coalesced = {name: {'requests': coalescer.requests, 'batches': coalescer.batches}
+                 for name, coalescer in [('score', state.scores), ('recommendation', state.recommendations)]}
+    return JSONResponse({'status': 'ok', 'version': state.service.version, 'customers': len(state.service.index),
+                         'coalesced': coalesced})
+
+
+async def customer_score(request):
+    customer_id = _customer_id(request)
+    return _found(await request.app.state.scores.submit(customer_id), customer_id)
+
+
+async def customer_recommendation(request):
+    customer_id = _customer_id(request)
+    scenario = parse_scenario(dict(request.query_params), request.app.state.service.model.mappings)
+    result = await request.app.state.recommendations.submit(customer_id, scenario_key(scenario))
+    return _found(result, customer_id)
+
+
+async def score_batch(request):
+    service = request.app.state.service
+    _, customer_ids = await _batch(request)
+    positions, missing = service.lookup(customer_ids)
+    return JSONResponse({'results': service.score(positions), 'missing': missing})
+
+
+async def recommendation_batch(request):
+    service = request.app.state.service
+    body, customer_ids = await _batch(request)
+    scenario = body.get('scenario')
+    scenario = parse_scenario({} if scenario is None else scenario, service.model.mappings)
+    positions, missing = service.lookup(customer_ids)
+    return JSONResponse({'results': service.recommend(positions, scenario), 'missing': missing})
+
+
+async def request_error(request, error):
+    return JSONResponse({'error': str(error)}, status_code=error.status)
+
+
+def create_app(service=None, coalesce_window=COALESCE_WINDOW):
+    """The service's ASGI app.
+
+    Without a service, the score store is opened at startup and reloaded
+    when a new version is published.
+    """
+
+    def score_handler(group, customer_ids):
+        return app.state.service.score_each(customer_ids)
+
+    def recommendation_handler(group, customer_ids):
+        scenario = Scenario('request', **dict(zip(SCENARIO_PARAMETERS, group)))
+        return app.state.service.recommend_each(customer_ids, scenario)
+
+    async def reload_store(registry):
+        # Rebuild the in-memory arrays in a thread when a new store version is published
+        while True:
+            await asyncio.sleep(registry.interval)
+            score_store = await asyncio.to_thread(registry.current)
+            if score_store.version != app.state.service.version:
+                app.state.service = await asyncio.to_thread(ScoringService, score_store)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        app.state.scores = RequestCoalescer(score_handler, coalesce_window)
+        app.state.recommendations = RequestCoalescer(recommendation_handler, coalesce_window)
+        if service is not None:
+            app.state.service = service
+            yield
+            return
+
+        registry = StoreRegistry()
+        app.state.service = ScoringService(registry.current())
+        reloader = asyncio.create_task(reload_store(registry))
+        yield
+        reloader.cancel()
+
+    routes = [
+        Route('/health', health),
+        Route('/customers/{customer_id}/score', customer_score),
+        Route('/customers/{customer_id}/recommendation', customer_recommendation),
+        Route('/score/batch', score_batch, methods=['POST']),
+        Route('/recommendations/batch', recommendation_batch, methods=['POST']),
+    ]
+    app = Starlette(routes=routes, lifespan=lifespan, exception_handlers={RequestError: request_error})
+    return app
+
+
+app = create_app()
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description='Serve ERICA scores and loan recommendations over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes, each with its own copy of the data')
+    args = parser.parse_args(argv)
+    uvicorn.run('erica.service:app', host=args.host, port=args.port, workers=args.workers, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""Nearest-neighbour index of similar customers.
+
+Customers are compared on their four concept scores, monthly income, bank
+tenure and loan amount, each standardized over the portfolio (amounts on a
+log scale, so a few very large balances do not dominate the distances).
+
+The index is an inverted file: k-means splits each customer's latest row
+into about sqrt(n) clusters, and the vectors are stored grouped by cluster.
+A query measures the exact distance only to the customers in the few
+clusters nearest to it, so it reads a few thousand vectors even on a
+multi-million-customer portfolio. The index is built offline per store
+version and saved next to the store:
+
+    python -m erica.similar build
+    python -m erica.similar query 17582714.2857 --k 20
+    python -m erica.similar recall --sample 500
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from erica.index import CustomerIndex
+from erica.scoring import CONCEPT_SCORES, SCORE_COLUMNS
+from erica.store import open_store, replacing
+
+SIMILARITY_FEATURES = CONCEPT_SCORES + ['MONTHLY_INCOME', 'BANK_TENURE', 'LOAN_AMOUNT']
+
+# Compared as log(1 + amount)
+LOG_FEATURES = ['MONTHLY_INCOME', 'LOAN_AMOUNT']
+
+# Neighbours returned by default
+K = 50
+
+# Clusters searched per query; more finds the exact neighbours more often
+NPROBE = 8
+
+# k-means is trained on this many customers per cluster, at most
+TRAIN_PER_CLUSTER = 64
+ITERATIONS = 10
+
+# Rows per block when measuring distances to the centroids
+CHUNK_ROWS = 65536
+
+
+def feature_matrix(table, positions, features=SIMILARITY_FEATURES):
+    """Unstandardized float32 features of the rows at `positions` of a store table."""
+    columns = table.select(features).take(positions)
+    matrix = np.column_stack([columns.column(feature).to_numpy().astype(np.float64) for feature in features])
+    for i, feature in enumerate(features):
+        if feature in LOG_FEATURES:
+            matrix[:, i] = np.log1p(np.maximum(matrix[:, i], 0))
+    return np.nan_to_num(matrix).astype(np.float32)
+
+
+def _nearest_centroid(vectors, centroids):
+    # |x - c|^2 = |x|^2 - 2 x.c + |c|^2, and |x|^2 does not change the argmin
+    squared = (centroids ** 2).sum(axis=1)
+    nearest = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), CHUNK_ROWS):
+        block = vectors[start:start + CHUNK_ROWS]
+        nearest[start:start + CHUNK_ROWS] = np.argmin(squared - 2 * block @ centroids.T, axis=1)
+    return nearest
+
+
+def kmeans(vectors, clusters, iterations=ITERATIONS, seed=0):
+    """Centroids of `clusters` k-means clusters, started from randomly chosen vectors."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        nearest = _nearest_centroid(vectors, centroids)
+        counts = np.bincount(nearest, minlength=clusters)
+        sums = np.zeros_like(centroids, dtype=np.float64)
+        np.add.at(sums, nearest, vectors)
+        # An empty cluster keeps its centroid
+        filled = counts > 0
+        centroids[filled] = (sums[filled] / counts[filled, None]).astype(np.float32)
+    return centroids
+
+
+class SimilarityIndex:
+    """Inverted-file index over the latest row of every customer."""
+
+    def __init__(self, centroids, vectors, rows, offsets, mean, std, version=None):
+        self.version = version
+        self.centroids = centroids
+        self.vectors = vectors
+        self.rows = rows
+        self.offsets = offsets
+        self.mean = mean
+        self.std = std
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def build(cls, score_store, seed=0):
+        table = score_store.table
+        version = score_store.version
+
+        # The store is ordered newest quarter first, so a customer's first row is their latest
+        ids = table.column('CUSTOMER_ID').to_numpy()
+        latest = np.flatnonzero(~pd.Index(ids).duplicated())
+        matrix = feature_matrix(table, latest)
+        mean = matrix.mean(axis=0)
+        std = matrix.std(axis=0)
+        std[std == 0] = 1
+        vectors = (matrix - mean) / std
+
+        clusters = max(1, int(np.sqrt(len(vectors))))
+        rng = np.random.default_rng(seed)
+        train = vectors
+        if len(vectors) > clusters * TRAIN_PER_CLUSTER:
+            train = vectors[rng.choice(len(vectors), clusters * TRAIN_PER_CLUSTER, replace=False)]
+        centroids = kmeans(train, clusters, seed=seed)
+
+        # Store the vectors grouped by cluster, so each cluster is one slice
+        nearest = _nearest_centroid(vectors, centroids)
+        order = np.argsort(nearest, kind='stable')
+        offsets = np.r_[0, np.cumsum(np.bincount(nearest, minlength=clusters))]
+        return cls(centroids, np.ascontiguousarray(vectors[order]), latest[order], offsets, mean, std,
+                   version=version)
+
+    def save(self, path):
+        with replacing(path) as scratch, open(scratch, 'wb') as f:
+            np.savez(f, centroids=self.centroids, vectors=self.vectors, rows=self.rows, offsets=self.offsets,
+                     mean=self.mean, std=self.std)
+
+    @classmethod
+    def load(cls, path, version=None):
+        with np.load(path) as arrays:
+            return cls(arrays['centroids'], arrays['vectors'], arrays['rows'], arrays['offsets'], arrays['mean'],
+                       arrays['std'], version=version)
+
+    def vector(self, table, position):
+        """Standardized features of the store row at `position`."""
+        return (feature_matrix(table, [position])[0] - self.mean) / self.std
+
+    def _candidates(self, vector, nprobe):
+        probes = min(nprobe, len(self.centroids))
+        distances = ((self.centroids - vector) ** 2).sum(axis=1)
+        probed = np.argpartition(distances, probes - 1)[:probes]
+        slices = [slice(self.offsets[c], self.offsets[c + 1]) for c in probed]
+        return np.concatenate([self.vectors[s] for s in slices]), np.concatenate([self.rows[s] for s in slices])
+
+    def _nearest(self, vectors, rows, vector, k, exclude):
+        distances = np.sqrt(((vectors - vector) ** 2).sum(axis=1))
+        keep = rows != exclude
+        distances, rows = distances[keep], rows[keep]
+        k = min(k, len(rows))
+        if k == 0:
+            return rows[:0], distances[:0]
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind='stable')]
+        return rows[top], distances[top]
+
+    def search(self, vector, k=K, nprobe=NPROBE, exclude=-1):
+        """Store row positions and distances of the k customers nearest to `vector`, nearest first.
+
+        The row at position `exclude`, usually the query customer's own, is left out.
+        """
+        vectors, rows = self._candidates(vector, nprobe)
+        return self._nearest(vectors, rows, vector, k, exclude)
+
+    def exact_search(self, vector, k=K, exclude=-1):
+        """The same as search, measuring every customer; for checking recall."""
+        return self._nearest(self.vectors, self.rows, vector, k, exclude)
+
+    def neighbors(self, score_store, position, k=K, nprobe=NPROBE):
+        """Peer keys, scores and distance of the k customers most similar to the store row at `position`."""
+        table = score_store.table
+        rows, distances = self.search(self.vector(table, position), k, nprobe, exclude=position)
+        columns = ['CUSTOMER_ID', 'CUSTOMER_LOCATION', 'CUSTOMER_SEGMENT', 'CUSTOMER_GROUP'] + SCORE_COLUMNS
+        frame = table.select(columns).take(rows).to_pandas()
+        frame['DISTANCE'] = distances
+        return frame
+
+    def recall(self, table, k=K, nprobe=NPROBE, sample=200, seed=0):
+        """Share of the exact k nearest neighbours that search finds, over a sample of customers."""
+        rng = np.random.default_rng(seed)
+        queries = rng.choice(self.rows, min(sample, len(self.rows)), replace=False)
+        found = total = 0
+        for position in queries:
+            vector = self.vector(table, position)
+            approximate, _ = self.search(vector, k, nprobe, exclude=position)
+            exact, _ = self.exact_search(vector, k, exclude=position)
+            found += len(np.intersect1d(approximate, exact))
+            total += len(exact)
+        return found / max(total, 1)
+
+
+def index_path(score_store):
+    return os.path.join(score_store.store_dir, f'similar-{score_store.version}.npz')
+
+
+def load_similarity_index(score_store):
+    """Read the index for the store's version, building it when the data changed."""
+    path = index_path(score_store)
+    if os.path.exists(path):
+        return SimilarityIndex.load(path, version=score_store.version)
+    similarity_index = SimilarityIndex.build(score_store)
+    similarity_index.save(path)
+    return similarity_index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build and query the similar customers index.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='Build the index for the current store version')
+    query_parser = commands.add_parser('query', help="A customer's most similar customers")
+    query_parser.add_argument('customer_id', type=float)
+    recall_parser = commands.add_parser('recall', help='Share of the exact nearest neighbours the index finds')
+    recall_parser.add_argument('--sample', type=int, default=200, help='Customers to query')
+    for command in (query_parser, recall_parser):
+        command.add_argument('--k', type=int, default=K)
+        command.add_argument('--nprobe', type=int, default=NPROBE)
+    for command in (build_parser, query_parser, recall_parser):
+        command.add_argument('--base-dir', default='.')
+        command.add_argument('--store-dir', default=None)
+    args = parser.parse_args(argv)
+
+    score_store = open_store(args.base_dir, args.store_dir)
+    if args.command == 'build':
+        similarity_index = SimilarityIndex.build(score_store)
+        similarity_index.save(index_path(score_store))
+        print(f'Indexed {len(similarity_index):,} customers in {len(similarity_index.centroids):,} clusters')
+        return
+
+    similarity_index = load_similarity_index(score_store)
+    if args.command == 'query':
+        index = CustomerIndex(score_store.table.column('CUSTOMER_ID').to_numpy())
+        neighbors = similarity_index.neighbors(score_store, index.position(args.customer_id), args.k, args.nprobe)
+        print(neighbors.to_string(index=False, formatters={'CUSTOMER_ID': '{:.4f}'.format}))
+    else:
+        recall = similarity_index.recall(score_store.table, args.k, args.nprobe, args.sample)
+        print(f'Recall at {args.k} with {args.nprobe} probes: {recall:.3f}')
+
+
+if __name__ == '__main__':
+    main()
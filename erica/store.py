@@ -0,0 +1,323 @@
+"""Columnar score store.
+
+The scaled, unscaled and customer-group tables are written once into one
+Arrow IPC file per quarter. The files are memory-mapped on open, so a
+session maps the data once and only the rows that are read get paged in.
+A StoreRegistry hands every session in a process the same store and swaps
+in a new version when one is published, without a restart.
+
+Build the store with:
+
+    python -m erica.store build
+"""
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from erica.schema import KEY_COLUMN, SCALED_SUFFIX, SCHEMA_VERSION, compact, customer_keys
+
+# Source tables produced by the scoring notebook
+SCALED_CSV = 'Resilience Score Analysis DF.csv'
+UNSCALED_CSV = 'Resilience Score Analysis Unscaled.csv'
+GROUP_CSV = 'Res Score with Cus Group.csv'
+SEGMENTS_CSV = '(Cleaned) Data/SEGMENTS_Q42023_Q12024.csv'
+
+STORE_DIR = 'store'
+MANIFEST = 'manifest.json'
+
+KEY_COLUMNS = ['CUSTOMER_ID', 'QUARTER']
+GROUP_COLUMN = 'CUSTOMER_GROUP'
+
+# Seconds between checks for a newly published store version
+RELOAD_INTERVAL = 30
+
+
+def read_frame(path):
+    """Read a CSV, Arrow/Feather or Parquet table by file extension."""
+    if path.endswith(('.arrow', '.feather')):
+        return feather.read_table(path, memory_map=True).to_pandas()
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def write_frame(frame, path):
+    """Write a table in the format given by the file extension."""
+    if path.endswith(('.arrow', '.feather')):
+        feather.write_feather(frame.reset_index(drop=True), path, compression='uncompressed')
+    elif path.endswith('.parquet'):
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+
+
+def quarter_key(quarter):
+    """Sort key for labels like 'Q1 2024'."""
+    q, year = quarter.split()
+    return int(year), int(q[1:])
+
+
+def quarter_filename(quarter, version):
+    # Files are named per version, so publishing a new one never rewrites a file a reader may have open
+    year, q = quarter_key(quarter)
+    return f'{year}Q{q}-{version}.arrow'
+
+
+def _source_paths(base_dir):
+    paths = [SCALED_CSV, UNSCALED_CSV, GROUP_CSV, SEGMENTS_CSV]
+    return [os.path.join(base_dir, p) for p in paths if os.path.exists(os.path.join(base_dir, p))]
+
+
+def source_fingerprint(base_dir='.'):
+    """Hash of the source CSVs' names, sizes and modification times."""
+    h = hashlib.sha1()
+    for path in _source_paths(base_dir):
+        stat = os.stat(path)
+        h.update(f'{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    return h.hexdigest()[:12]
+
+
+def _read_groups(base_dir, scaled):
+    # Prefer the exported group table; otherwise join the segments feed
+    group_path = os.path.join(base_dir, GROUP_CSV)
+    if os.path.exists(group_path):
+        group = pd.read_csv(group_path, usecols=[GROUP_COLUMN])
+        return group[GROUP_COLUMN].to_numpy()
+    segments = pd.read_csv(os.path.join(base_dir, SEGMENTS_CSV), usecols=['CUSTOMER_ID', GROUP_COLUMN])
+    segments = segments.drop_duplicates('CUSTOMER_ID').set_index('CUSTOMER_ID')[GROUP_COLUMN]
+    return scaled['CUSTOMER_ID'].map(segments).to_numpy()
+
+
+def combine_tables(scaled, unscaled, groups):
+    """Merge the row-aligned scaled and unscaled tables into one compact frame.
+
+    Columns whose scaled values differ from the raw ones are kept a second
+    time with the SCALED_SUFFIX, and every customer gets a CUSTOMER_KEY.
+    """
+    combined = unscaled.copy()
+    combined.insert(1, KEY_COLUMN, customer_keys(combined['CUSTOMER_ID']))
+    combined[GROUP_COLUMN] = groups
+    for column in scaled.columns:
+        if not scaled[column].equals(unscaled[column]):
+            combined[column + SCALED_SUFFIX] = scaled[column]
+    return compact(combined)
+
+
+def build_store(base_dir='.', store_dir=None):
+    """Convert the source CSVs into one Arrow file per quarter."""
+    store_dir = store_dir or os.path.join(base_dir, STORE_DIR)
+    scaled = pd.read_csv(os.path.join(base_dir, SCALED_CSV))
+    unscaled = pd.read_csv(os.path.join(base_dir, UNSCALED_CSV))
+    return write_store(store_dir, scaled, unscaled, _read_groups(base_dir, scaled), source_fingerprint(base_dir))
+
+
+def write_store(store_dir, scaled, unscaled, groups, source):
+    """Write row-aligned scaled and unscaled tables as a new store; returns the manifest."""
+    os.makedirs(store_dir, exist_ok=True)
+    if not scaled['CUSTOMER_ID'].equals(unscaled['CUSTOMER_ID']):
+        raise ValueError('Scaled and unscaled tables are not row-aligned')
+    combined = combine_tables(scaled, unscaled, groups)
+
+    manifest = {
+        'source': source,
+        'revision': 0,
+        'schema': SCHEMA_VERSION,
+        'scaled_columns': list(scaled.columns),
+        'unscaled_columns': list(unscaled.columns),
+        'quarters': [],
+    }
+    for quarter in combined['QUARTER'].unique():
+        write_quarter(store_dir, manifest, combined[combined['QUARTER'] == quarter])
+    return write_manifest(store_dir, manifest)
+
+
+@contextlib.contextmanager
+def replacing(path):
+    """Scratch path to write a file at, which then replaces `path` in one step.
+
+    The scratch name is unique to the process and thread, so concurrent
+    writers (worker processes rebuilding the same stale store, say) never
+    write into each other's file; the last one to finish wins.
+    """
+    scratch = f'{path}.{os.getpid()}-{threading.get_ident()}.tmp'
+    try:
+        yield scratch
+        os.replace(scratch, path)
+    finally:
+        if os.path.exists(scratch):
+            os.remove(scratch)
+
+
+def write_quarter(store_dir, manifest, part, schema=None):
+    """Write (or replace) one quarter's file and record it in the manifest.
+
+    Pass the store's schema when adding to an existing store, so every
+    quarter file has the same column types. The file is named for the
+    version the manifest will be published as, so set its revision first;
+    the manifest itself is only written by write_manifest.
+    """
+    quarter = part['QUARTER'].iloc[0]
+    table = pa.Table.from_pandas(part, schema=schema, preserve_index=False)
+    path = os.path.join(store_dir, quarter_filename(quarter, manifest_version(manifest)))
+    with replacing(path) as scratch:
+        feather.write_feather(table, scratch, compression='uncompressed')
+
+    files = [q for q in manifest['quarters'] if q['quarter'] != quarter]
+    files.append({'quarter': quarter, 'file': os.path.basename(path), 'rows': len(part)})
+    # Newest quarter first, so the first match for a customer is their latest row
+    manifest['quarters'] = sorted(files, key=lambda q: quarter_key(q['quarter']), reverse=True)
+
+
+def manifest_version(manifest):
+    """Version a manifest is published as, from its source, revision and schema."""
+    stamp = f"{manifest['source']}:{manifest['revision']}:{manifest.get('schema')}"
+    return hashlib.sha1(stamp.encode()).hexdigest()[:12]
+
+
+def write_manifest(store_dir, manifest):
+    """Stamp a new version on the manifest and write it atomically."""
+    manifest['version'] = manifest_version(manifest)
+    path = os.path.join(store_dir, MANIFEST)
+    with replacing(path) as scratch, open(scratch, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(store_dir):
+    path = os.path.join(store_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class ScoreStore:
+    """Memory-mapped view over the quarterly score files."""
+
+    def __init__(self, store_dir, manifest):
+        self.store_dir = store_dir
+        self.manifest = manifest
+        self.version = manifest['version']
+        self.quarters = [q['quarter'] for q in manifest['quarters']]
+        tables = [
+            pa.ipc.open_file(pa.memory_map(os.path.join(store_dir, q['file']))).read_all()
+            for q in manifest['quarters']
+        ]
+        self.table = pa.concat_tables(tables)
+        self._frames = {}
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def _columns(self, name):
+        if name == 'scaled':
+            return [(c + SCALED_SUFFIX if c + SCALED_SUFFIX in self.table.column_names else c, c)
+                    for c in self.manifest['scaled_columns']]
+        if name == 'unscaled':
+            return [(c, c) for c in self.manifest['unscaled_columns']]
+        if name == 'group':
+            return self._columns('scaled') + [(GROUP_COLUMN, GROUP_COLUMN)]
+        raise KeyError(name)
+
+    def _to_pandas(self, table, name):
+        columns = self._columns(name)
+        frame = table.select([stored for stored, _ in columns]).to_pandas(split_blocks=True)
+        frame.columns = [column for _, column in columns]
+        return frame
+
+    def frame(self, name):
+        """Full 'scaled', 'unscaled' or 'group' table, materialized once."""
+        if name not in self._frames:
+            self._frames[name] = self._to_pandas(self.table, name)
+        return self._frames[name]
+
+    @property
+    def scaled(self):
+        return self.frame('scaled')
+
+    @property
+    def unscaled(self):
+        return self.frame('unscaled')
+
+    @property
+    def group(self):
+        return self.frame('group')
+
+    def take(self, positions, name='scaled'):
+        """Rows at the given positions, reading only those rows from the files."""
+        return self._to_pandas(self.table.take(pa.array(positions, type=pa.int64())), name)
+
+
+def current_manifest(base_dir='.', store_dir=None, rebuild_if_stale=True):
+    """The store's manifest, (re)building the store first when the source CSVs changed.
+
+    Quarters appended incrementally are kept until the source CSVs or the
+    schema change.
+    """
+    store_dir = store_dir or os.path.join(base_dir, STORE_DIR)
+    manifest = read_manifest(store_dir)
+    stale = manifest is not None and (manifest.get('source') != source_fingerprint(base_dir)
+                                      or manifest.get('schema') != SCHEMA_VERSION)
+    if manifest is None or (rebuild_if_stale and _source_paths(base_dir) and stale):
+        manifest = build_store(base_dir, store_dir)
+    return manifest
+
+
+def open_store(base_dir='.', store_dir=None, rebuild_if_stale=True):
+    """Open the current version of the store."""
+    store_dir = store_dir or os.path.join(base_dir, STORE_DIR)
+    return ScoreStore(store_dir, current_manifest(base_dir, store_dir, rebuild_if_stale))
+
+
+class StoreRegistry:
+    """Process-wide current ScoreStore, swapped when a new version is published.
+
+    current() checks the manifest at most every `interval` seconds. Stores
+    already handed out stay readable after a swap, because published files
+    are replaced rather than rewritten in place.
+    """
+
+    def __init__(self, base_dir='.', store_dir=None, interval=RELOAD_INTERVAL):
+        self.base_dir = base_dir
+        self.store_dir = store_dir or os.path.join(base_dir, STORE_DIR)
+        self.interval = interval
+        self._store = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """The latest published store."""
+        if self._store is not None and time.monotonic() - self._checked < self.interval:
+            return self._store
+        with self._lock:
+            if self._store is None or time.monotonic() - self._checked >= self.interval:
+                manifest = current_manifest(self.base_dir, self.store_dir)
+                if self._store is None or manifest['version'] != self._store.version:
+                    self._store = ScoreStore(self.store_dir, manifest)
+                self._checked = time.monotonic()
+            return self._store
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the ERICA columnar score store.')
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--base-dir', default='.', help='Directory holding the source CSVs')
+    parser.add_argument('--store-dir', default=None, help=f'Output directory (default: <base-dir>/{STORE_DIR})')
+    args = parser.parse_args(argv)
+
+    manifest = build_store(args.base_dir, args.store_dir)
+    for q in manifest['quarters']:
+        print(f"{q['quarter']}: {q['rows']} rows -> {q['file']}")
+    print(f"Store version {manifest['version']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import streamlit as st
+
+from erica.dashboard import load_screener, load_store
+from erica.scoring import FACTOR_THRESHOLDS, RISK_LEVELS
+from erica.screening import DIMENSIONS
+
+st.set_page_config(
+    page_title="Portfolio Screening",
+    page_icon="🔎",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+st.title("🔎 Portfolio Screening")
+
+st.info("💡 Find every customer matching a risk level, weak resilience factors and peer group. Each customer is screened on their latest quarter.")
+
+score_store = load_store()
+screener = load_screener(score_store, score_store.version)
+
+# Filters
+st.sidebar.subheader("Screening Filters")
+risk = st.sidebar.multiselect("Risk Level", RISK_LEVELS)
+weak = st.sidebar.multiselect("Weak Factors", list(FACTOR_THRESHOLDS),
+                              format_func=lambda factor: factor.replace('_Score', ''),
+                              help="Concept scores below their dashboard thresholds; customers must be weak in all selected factors.")
+location = st.sidebar.multiselect("Location", screener.values('CUSTOMER_LOCATION'))
+segment = st.sidebar.multiselect("Segment", screener.values('CUSTOMER_SEGMENT'), format_func=lambda tier: f"Tier {tier}")
+group = st.sidebar.multiselect("Customer Group", screener.values('CUSTOMER_GROUP'))
+filters = {'risk': risk, 'weak': weak, 'location': location, 'segment': segment, 'group': group}
+
+st.sidebar.info("""Please note that this dashboard is a prototype. 
+                Users are advised that the tool may contain errors, 
+                bugs, or limitations and should be used with caution 
+                and awareness of potential risks, and the developers 
+                make no warranties or guarantees regarding its performance, 
+                reliability, or suitability for any specific purpose.""")
+
+matches = screener.count(**filters)
+col1, col2 = st.columns(2)
+col1.metric("Matching Customers", f"{matches:,}")
+col2.metric("Share of Portfolio", f"{matches / max(screener.size, 1):.1%}")
+
+# Risk levels by peer dimension
+st.subheader("📊 Risk Levels")
+labels = {'CUSTOMER_LOCATION': "Location", 'CUSTOMER_SEGMENT': "Segment", 'CUSTOMER_GROUP': "Customer Group"}
+by = st.multiselect("Count by", DIMENSIONS, default=['CUSTOMER_LOCATION'], format_func=labels.get)
+if by:
+    st.dataframe(screener.risk_counts(by, **filters), width='stretch')
+
+# Flagged customers
+st.subheader("🚩 Matching Customers")
+if matches:
+    st.dataframe(screener.select(**filters), hide_index=True, width='stretch',
+                 column_config={'CUSTOMER_ID': st.column_config.NumberColumn(format="%.4f")})
+else:
+    st.warning("No customers match these filters.")
@@ -0,0 +1,30 @@
+"""Fixtures shared by the tests: the repository's tables and a score store built from them."""
+import os
+
+import pandas as pd
+import pytest
+
+from erica.store import open_store
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='session')
+def base_dir():
+    return BASE_DIR
+
+
+@pytest.fixture(scope='session')
+def unscaled():
+    return pd.read_csv(os.path.join(BASE_DIR, 'Resilience Score Analysis Unscaled.csv'))
+
+
+@pytest.fixture(scope='session')
+def published():
+    return pd.read_csv(os.path.join(BASE_DIR, 'Resilience Score Analysis DF.csv'))
+
+
+@pytest.fixture(scope='session')
+def score_store(tmp_path_factory):
+    # Built from the repository's tables into a scratch directory, so the checked-in store is left alone
+    return open_store(BASE_DIR, str(tmp_path_factory.mktemp('store')))
@@ -0,0 +1,62 @@
+"""Checks of the loan affordability and amortization kernels."""
+import numpy as np
+import pytest
+
+from erica.affordability import (amortization_schedule, max_affordable_principal, monthly_installment, offer_grid,
+                                 sensitivity_table)
+
+
+def scalar_installment(principal, annual_rate, years):
+    # The dashboard's installment for one loan
+    rate = annual_rate / 12
+    if rate == 0:
+        return principal / (years * 12)
+    return principal * rate / (1 - (1 + rate) ** (-12 * years))
+
+
+@pytest.mark.parametrize('annual_rate', [0.0, 0.06, 0.18])
+@pytest.mark.parametrize('years', [1, 5, 2.5])
+def test_installment_matches_scalar_formula(annual_rate, years):
+    principals = np.array([0.0, 1000.0, 250000.0, 1158710.0])
+    expected = [scalar_installment(p, annual_rate, years) for p in principals]
+    np.testing.assert_allclose(monthly_installment(principals, annual_rate, years), expected, rtol=1e-12)
+    # The affordable principal is the loan whose installment is exactly the allowed share
+    principal = max_affordable_principal(principals, 0.2, annual_rate, years)
+    np.testing.assert_allclose(monthly_installment(principal, annual_rate, years), principals * 0.2, atol=1e-9)
+
+
+def test_offer_grid_broadcasts_every_combination():
+    incomes, rates, tenors = [10000.0, 50000.0], [0.0, 0.06, 0.12], [1, 3, 5, 10]
+    grid = offer_grid(incomes, rates, tenors, 0.2)
+    assert grid.shape == (2, 3, 4)
+    for i, income in enumerate(incomes):
+        for j, rate in enumerate(rates):
+            for k, years in enumerate(tenors):
+                assert grid[i, j, k] == pytest.approx(max_affordable_principal(income, 0.2, rate, years))
+    table = sensitivity_table(incomes[1], 0.2, rates, tenors)
+    np.testing.assert_array_equal(table.to_numpy(), grid[1].T)
+    assert table.columns.tolist() == ['0%', '6%', '12%'] and table.index.tolist() == tenors
+
+
+def test_amortization_schedule_repays_each_loan():
+    principals = np.array([100000.0, 50000.0, 75000.0])
+    rates = np.array([0.06, 0.0, 0.12])
+    years = np.array([5, 2, 3])
+    schedule = amortization_schedule(principals, rates, years)
+    assert schedule['payment'].shape == (3, 60)
+
+    installments = monthly_installment(principals, rates, years)
+    for i, months in enumerate(years * 12):
+        np.testing.assert_allclose(schedule['payment'][i, :months], installments[i])
+        # Shorter loans are padded with zeros after they are repaid
+        assert not schedule['payment'][i, months:].any() and not schedule['balance'][i, months - 1:].any()
+    np.testing.assert_allclose(schedule['principal'].sum(axis=1), principals)
+    np.testing.assert_allclose(schedule['payment'] - schedule['interest'], schedule['principal'])
+    assert not schedule['interest'][1].any()
+
+
+def test_amortization_balance_follows_each_payment():
+    schedule = amortization_schedule(120000.0, 0.06, 1)
+    opening = np.r_[120000.0, schedule['balance'][:-1]]
+    np.testing.assert_allclose(schedule['interest'], opening * 0.005)
+    np.testing.assert_allclose(schedule['balance'], opening - schedule['principal'], atol=1e-6)
@@ -0,0 +1,82 @@
+"""Checks of the request coalescer."""
+import asyncio
+
+import pytest
+
+from erica.batching import RequestCoalescer
+
+
+def recording_handler(calls):
+    # Squares each item and records the batches it was called with
+    def handler(group, items):
+        calls.append((group, list(items)))
+        return [item * item for item in items]
+    return handler
+
+
+def test_each_caller_gets_its_own_result():
+    calls = []
+    coalescer = RequestCoalescer(recording_handler(calls), window=0.01)
+
+    async def burst():
+        return await asyncio.gather(*(coalescer.submit(i) for i in range(20)))
+
+    assert asyncio.run(burst()) == [i * i for i in range(20)]
+    assert calls == [(None, list(range(20)))]
+    assert (coalescer.batches, coalescer.requests) == (1, 20)
+
+
+def test_groups_are_batched_apart():
+    calls = []
+    coalescer = RequestCoalescer(recording_handler(calls), window=0.01)
+
+    async def burst():
+        return await asyncio.gather(*(coalescer.submit(i, group=i % 2) for i in range(6)))
+
+    assert asyncio.run(burst()) == [0, 1, 4, 9, 16, 25]
+    assert sorted(calls) == [(0, [0, 2, 4]), (1, [1, 3, 5])]
+
+
+def test_full_batch_is_sent_without_waiting():
+    calls = []
+    coalescer = RequestCoalescer(recording_handler(calls), window=60, max_batch_size=3)
+
+    async def burst():
+        return await asyncio.wait_for(asyncio.gather(*(coalescer.submit(i) for i in range(6))), timeout=5)
+
+    assert asyncio.run(burst()) == [0, 1, 4, 9, 16, 25]
+    assert [items for _, items in calls] == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_handler_error_reaches_every_caller():
+    def failing(group, items):
+        raise KeyError('no such customer')
+
+    coalescer = RequestCoalescer(failing, window=0.01)
+
+    async def burst():
+        return await asyncio.gather(*(coalescer.submit(i) for i in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(burst())
+    assert all(isinstance(error, KeyError) for error in errors)
+
+    async def one():
+        return await coalescer.submit(1)
+
+    with pytest.raises(KeyError):
+        asyncio.run(one())
+
+
+def test_cancelled_caller_does_not_affect_others():
+    calls = []
+    coalescer = RequestCoalescer(recording_handler(calls), window=0.02)
+
+    async def burst():
+        tasks = [asyncio.ensure_future(coalescer.submit(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks[1].cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    first, cancelled, last = asyncio.run(burst())
+    assert (first, last) == (0, 4)
+    assert isinstance(cancelled, asyncio.CancelledError)
@@ -0,0 +1,161 @@
+"""Checks of the streaming ETL on small synthetic feeds."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from erica import etl
+from erica.etl import FEEDS, KEYS
+from erica.schema import KEY_COLUMN, compact
+
+QUARTERS = ['Q4 2023', 'Q1 2024']
+MONTHS = {'Q4 2023': ['10', '11', '12'], 'Q1 2024': ['01', '02', '03']}
+
+
+def write_feeds(data_dir, customers=80, rows=600, seed=0):
+    """CSV feeds in the layout of the cleaned data, with duplicates, NO_DATA labels and missing values."""
+    rng = np.random.default_rng(seed)
+    ids = np.round(rng.uniform(1000, 10**8, customers), 4)
+
+    def some(n=None):
+        # Most customers, with a few repeated, as the real feeds have
+        n = n or customers
+        return rng.choice(ids, n)
+
+    def quarter_labels(n):
+        return rng.choice(QUARTERS, n)
+
+    def dates(n, month_format=False):
+        quarters = quarter_labels(n)
+        months = [rng.choice(MONTHS[q]) for q in quarters]
+        years = [q[3:] for q in quarters]
+        if month_format:
+            return [f'{m}/{y}' for m, y in zip(months, years)]
+        return [f'{y}-{m}-{rng.integers(1, 28):02d}' for m, y in zip(months, years)]
+
+    def amounts(n):
+        return np.round(rng.lognormal(8, 1, n), 2)
+
+    tables = {
+        'cdna': pd.DataFrame({
+            'CUSTOMER_ID': np.r_[ids, some(8)], 'BANK_TENURE': rng.uniform(0, 30, customers + 8),
+            'SEC': rng.choice(['A', 'B1', 'C2', 'E'], customers + 8),
+            'DIGITAL_INDICATOR': rng.choice(['DIGITAL', 'TRADITIONAL', 'NO_DATA'], customers + 8, p=[.5, .4, .1]),
+            'CUSTOMER_LOCATION': rng.choice(['NCR', 'REGION III'], customers + 8),
+            'AGE': rng.uniform(20, 70, customers + 8), 'GENDER': rng.choice(['MALE', 'FEMALE'], customers + 8),
+            'EDUCATION': rng.choice(['LOW', 'MID', 'HIGH', 'NO_DATA'], customers + 8, p=[.3, .3, .3, .1]),
+            'MONTHLY_INCOME': np.where(rng.random(customers + 8) < 0.05, np.nan, amounts(customers + 8)),
+        }),
+        'debit': pd.DataFrame({'CUSTOMER_ID': some(rows), 'TRANSACTION_TYPE': 'PHYSICAL',
+                               'QUARTER': quarter_labels(rows), 'TRANSACTION_AMOUNT': amounts(rows)}),
+        'cctrans': pd.DataFrame({'CUSTOMER_ID': some(rows), 'TRANSACTION_DATE': dates(rows),
+                                 'TRANSACTION_AMOUNT': amounts(rows)}),
+        'ibft': pd.DataFrame({'CUSTOMER_ID': some(rows), 'TRANSACTION_DATE': dates(rows),
+                              'TRANSACTION_AMOUNT': amounts(rows)}),
+        'products': pd.DataFrame({'CUSTOMER_ID': some(rows), 'CURRENT_MONTH': dates(rows, month_format=True),
+                                  **{column: rng.integers(0, 2, rows) for column in
+                                     ['AUTO_LOAN_INDICATOR', 'HOUSING_LOAN_INDICATOR', 'SAVINGS_ACCOUNT_INDICATOR']}}),
+        'segments': pd.DataFrame({'CUSTOMER_ID': some(), 'CUSTOMER_GROUP': rng.choice(['RETAIL', 'BUSINESS BANKING'],
+                                                                                      customers),
+                                  'CUSTOMER_SEGMENT': rng.choice(['Tier 1', 'Tier 6', None], customers,
+                                                                 p=[.45, .45, .1])}),
+        'ccconso': pd.DataFrame({'CUSTOMER_ID': some(), 'TOTAL_BALANCE': amounts(customers),
+                                 'CURRENT_MONTH_BILLING': amounts(customers),
+                                 'PREVIOUS_MONTH_BILLING': np.where(rng.random(customers) < 0.05, np.nan,
+                                                                    amounts(customers)),
+                                 'REVOLVING_BALANCE': amounts(customers)}),
+        'loan': pd.DataFrame({'CUSTOMER_ID': some(), 'LOAN_AMOUNT': amounts(customers),
+                              'LOAN_BEHAVIOR': rng.choice(['Current', 'Principal Past Due'], customers)}),
+    }
+    for name, table in tables.items():
+        table.to_csv(os.path.join(data_dir, FEEDS[name].filename), index=False)
+    return tables
+
+
+@pytest.fixture(scope='module')
+def feeds_dir(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp('feeds')
+    write_feeds(str(data_dir))
+    return str(data_dir)
+
+
+def read_feed(feeds_dir, name):
+    feed = FEEDS[name]
+    return pd.read_csv(os.path.join(feeds_dir, feed.filename), usecols=feed.columns)
+
+
+def whole_file_sums(feeds_dir, name):
+    # The same sums from the whole file at once
+    feed = FEEDS[name]
+    table = read_feed(feeds_dir, name)
+    if feed.kind == 'transactions':
+        quarters = pd.to_datetime(table[feed.date_column], format=feed.date_format).dt.to_period('Q')
+        table['QUARTER'] = [f'Q{q.quarter} {q.year}' for q in quarters]
+    sums = table.groupby(KEYS)[feed.sums].sum().reset_index().rename(columns=feed.rename)
+    return sums.sort_values(KEYS, ignore_index=True)
+
+
+@pytest.mark.parametrize('name', ['debit', 'cctrans', 'ibft', 'products'])
+@pytest.mark.parametrize('chunksize', [7, 100, 10**6])
+def test_chunked_sums_match_whole_file(feeds_dir, name, chunksize):
+    sums = etl.aggregate_feed(FEEDS[name], feeds_dir, chunksize).sort_values(KEYS, ignore_index=True)
+    pd.testing.assert_frame_equal(sums, whole_file_sums(feeds_dir, name), check_dtype=False)
+
+
+def test_quarter_filter_keeps_one_quarter(feeds_dir):
+    sums = etl.aggregate_feed(FEEDS['cctrans'], feeds_dir, 50, quarter='Q1 2024')
+    expected = whole_file_sums(feeds_dir, 'cctrans')
+    expected = expected[expected['QUARTER'] == 'Q1 2024'].reset_index(drop=True)
+    pd.testing.assert_frame_equal(sums.sort_values(KEYS, ignore_index=True), expected, check_dtype=False)
+
+
+@pytest.mark.parametrize('name', ['cdna', 'segments', 'loan'])
+def test_customer_feeds_keep_first_row_across_chunks(feeds_dir, name):
+    feed = FEEDS[name]
+    table = read_feed(feeds_dir, name)
+    if feed.required:
+        table = table.dropna(subset=feed.required)
+    expected = table.drop_duplicates('CUSTOMER_ID', ignore_index=True)
+    pd.testing.assert_frame_equal(etl.aggregate_feed(feed, feeds_dir, 9), expected)
+
+
+def test_quarter_codes_round_trip():
+    labels = pd.Series(['Q4 2023', 'Q1 2024', 'Q4 2023'])
+    codes = etl.quarter_codes_from_labels(labels)
+    assert codes.tolist() == [20234, 20241, 20234]
+    assert list(etl.quarter_labels(codes)) == labels.tolist()
+
+
+def test_parallel_pipeline_matches_serial(feeds_dir, tmp_path):
+    serial = etl.run_pipeline(feeds_dir, str(tmp_path / 'serial'), chunksize=50, workers=1)
+    parallel = etl.run_pipeline(feeds_dir, str(tmp_path / 'parallel'), chunksize=50, workers=2)
+    assert len(serial) > 0
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert sorted(os.listdir(tmp_path / 'parallel')) == sorted([f'{name}.arrow' for name in FEEDS] + ['combined.arrow'])
+
+
+def chained_merges(tables):
+    # The join as a chain of pd.merge calls over JOIN_ORDER, each feed without unusable or duplicate rows
+    merged = None
+    for name in etl.JOIN_ORDER:
+        table = tables[name]
+        table = table[etl.usable_rows(table)]
+        keys = ['CUSTOMER_ID'] if FEEDS[name].kind == 'customer' else KEYS
+        table = table.drop_duplicates(keys)
+        if merged is None:
+            merged = table
+        else:
+            merged = merged.merge(table, on=[key for key in keys if key in merged], how='inner')
+    return merged.reset_index(drop=True)
+
+
+def test_join_matches_chained_merges(feeds_dir):
+    tables = {name: compact(etl.aggregate_feed(FEEDS[name], feeds_dir, 50)) for name in FEEDS}
+    joined, steps = etl.join_feeds(tables)
+    expected = compact(chained_merges(tables))
+    assert 0 < len(joined) < len(tables['debit'])
+    pd.testing.assert_frame_equal(joined.drop(columns=KEY_COLUMN), expected, check_categorical=False)
+    # Customers are keyed by their row among the usable master rows
+    assert joined.groupby(KEY_COLUMN)['CUSTOMER_ID'].nunique().eq(1).all()
+    assert steps[-1]['rows'] - steps[-1]['dropped'] == len(joined)
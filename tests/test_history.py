@@ -0,0 +1,56 @@
+"""Checks of the score history index."""
+import numpy as np
+import pytest
+
+from erica.history import ScoreHistory
+from erica.scoring import RESILIENCE_SCORE, SCORE_COLUMNS
+
+
+@pytest.fixture(scope='module')
+def history(score_store):
+    return ScoreHistory(score_store)
+
+
+def quarter_on_quarter(score_store, column=RESILIENCE_SCORE):
+    # Changes from a merge of the two quarters' rows
+    scaled = score_store.scaled
+    current, previous = (scaled[scaled['QUARTER'] == q][['CUSTOMER_ID', column]] for q in score_store.quarters)
+    merged = current.merge(previous, on='CUSTOMER_ID', suffixes=('', '_previous'))
+    merged['change'] = merged[column].astype(np.float64) - merged[column + '_previous'].astype(np.float64)
+    return merged.sort_values('CUSTOMER_ID', ignore_index=True)
+
+
+def test_trajectory_is_oldest_first(score_store, history):
+    scaled = score_store.scaled
+    both = scaled['CUSTOMER_ID'].value_counts()
+    customer_id = both.index[both == 2][0]
+    trajectory = history.trajectory(customer_id)
+    assert trajectory['QUARTER'].tolist() == ['Q4 2023', 'Q1 2024']
+    expected = scaled[scaled['CUSTOMER_ID'] == customer_id].set_index('QUARTER').loc[['Q4 2023', 'Q1 2024']]
+    np.testing.assert_array_equal(trajectory[SCORE_COLUMNS].to_numpy(), expected[SCORE_COLUMNS].to_numpy())
+
+
+def test_changes_match_merged_quarters(score_store, history):
+    changes = history.changes('Q1 2024')
+    assert changes['change'].is_monotonic_increasing
+    expected = quarter_on_quarter(score_store)
+    actual = changes.sort_values('CUSTOMER_ID', ignore_index=True)
+    np.testing.assert_array_equal(actual['CUSTOMER_ID'], expected['CUSTOMER_ID'])
+    np.testing.assert_allclose(actual['change'], expected['change'])
+    assert history.changes('Q4 2023').empty and history.previous_quarter('Q4 2023') is None
+
+
+@pytest.mark.parametrize('threshold', [0.0, 0.05, 0.2, 10.0])
+def test_fallen_matches_a_filter(score_store, history, threshold):
+    expected = quarter_on_quarter(score_store)
+    expected = expected[expected['change'] < -threshold]
+    fallen = history.fallen(threshold)
+    assert sorted(fallen['CUSTOMER_ID']) == sorted(expected['CUSTOMER_ID'])
+
+
+def test_change_of_one_customer(score_store, history):
+    expected = quarter_on_quarter(score_store).iloc[0]
+    assert history.change(expected['CUSTOMER_ID']) == pytest.approx(expected['change'])
+    assert history.change(expected['CUSTOMER_ID'], quarter='Q4 2023') is None
+    once = score_store.scaled['CUSTOMER_ID'].value_counts()
+    assert history.change(once.index[once == 1][0]) is None
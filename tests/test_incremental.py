@@ -0,0 +1,72 @@
+"""Checks of the incremental quarterly refresh."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from erica.incremental import append_quarter
+from erica.scoring import SCORE_COLUMNS, ScoringModel, load_store_model
+from erica.store import open_store
+
+
+@pytest.fixture
+def store_dir(base_dir, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    open_store(base_dir, store_dir)
+    return store_dir
+
+
+def next_quarter_rows(score_store):
+    # The latest quarter's customers again, with higher incomes
+    latest = score_store.unscaled[score_store.unscaled['QUARTER'] == score_store.quarters[0]]
+    return latest.assign(QUARTER='Q2 2024', MONTHLY_INCOME=latest['MONTHLY_INCOME'] * 1.1)
+
+
+def test_append_quarter_adds_scored_rows(base_dir, store_dir):
+    before = open_store(base_dir, store_dir)
+    rows = next_quarter_rows(before)
+    append_quarter('Q2 2024', rows, base_dir, store_dir)
+
+    after = open_store(base_dir, store_dir)
+    assert after.quarters[0] == 'Q2 2024' and len(after) == len(before) + len(rows)
+    model = load_store_model(after)
+    assert model.count == len(before) + len(rows)
+
+    # New rows are scored with the updated statistics; earlier quarters keep their stored scores
+    appended = after.scaled[after.scaled['QUARTER'] == 'Q2 2024']
+    np.testing.assert_allclose(appended[SCORE_COLUMNS].to_numpy(), model.score_array(rows), atol=1e-6)
+    earlier = after.scaled[after.scaled['QUARTER'] != 'Q2 2024'].reset_index(drop=True)
+    pd.testing.assert_frame_equal(earlier[SCORE_COLUMNS], before.scaled[SCORE_COLUMNS])
+
+
+def test_append_quarter_keeps_previous_version_readable(base_dir, store_dir):
+    before = open_store(base_dir, store_dir)
+    files = {name: os.path.getmtime(os.path.join(store_dir, name)) for name in os.listdir(store_dir)
+             if name.endswith('.arrow')}
+    append_quarter('Q2 2024', next_quarter_rows(before), base_dir, store_dir, refresh=True)
+
+    # A refresh writes every quarter under the new version's names and leaves the old files alone
+    assert all(os.path.getmtime(os.path.join(store_dir, name)) == mtime for name, mtime in files.items())
+    assert len(before.scaled) == before.table.num_rows
+
+
+def test_refresh_rescores_history_as_a_full_fit(base_dir, store_dir):
+    before = open_store(base_dir, store_dir)
+    rows = next_quarter_rows(before)
+    append_quarter('Q2 2024', rows, base_dir, store_dir, refresh=True)
+
+    after = open_store(base_dir, store_dir)
+    history = pd.concat([before.unscaled, rows], ignore_index=True)
+    assert len(after) == len(history)
+    expected = ScoringModel.fit(history).score(history)
+    # Stored quarters are newest first, so compare row for row by quarter and customer
+    stored = after.scaled.set_index(['QUARTER', 'CUSTOMER_ID'])[SCORE_COLUMNS]
+    expected.index = pd.MultiIndex.from_frame(history[['QUARTER', 'CUSTOMER_ID']])
+    np.testing.assert_allclose(stored.loc[expected.index].to_numpy(), expected.to_numpy(), atol=1e-6)
+
+
+def test_append_quarter_rejects_stored_quarter(base_dir, store_dir):
+    score_store = open_store(base_dir, store_dir)
+    with pytest.raises(ValueError):
+        append_quarter(score_store.quarters[0], next_quarter_rows(score_store), base_dir, store_dir)
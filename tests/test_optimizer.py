@@ -0,0 +1,61 @@
+"""Checks of the target score optimizer."""
+import numpy as np
+import pytest
+
+from erica.optimizer import TargetOptimizer, feature_caps
+from erica.scoring import FEATURES, ScoringModel, feature_matrix
+
+# A target of 0.5 may be passed by up to this much where coded features round up a whole step
+CODE_OVERSHOOT = 0.05
+
+
+@pytest.fixture(scope='module')
+def optimizer(unscaled):
+    return TargetOptimizer(ScoringModel.fit(unscaled), feature_caps(unscaled))
+
+
+def test_target_optimizer_reaches_targets_within_caps(optimizer, unscaled):
+    plans = optimizer.plans(unscaled, 0.5)
+
+    below = plans['Resilience_Score'] < 0.5
+    reached = plans['REACHED'] & below
+    assert reached.any()
+    planned = plans.loc[reached, 'PLANNED_Resilience_Score']
+    assert (planned >= 0.5 - 1e-9).all() and (planned <= 0.5 + CODE_OVERSHOOT).all()
+
+    # Customers already at the target are left as they are
+    changes = plans[[column for column in plans if column.endswith('_CHANGE')]]
+    assert (changes[~below] == 0).all().all()
+
+    # Features are only raised, never past their caps, and fixed features do not move
+    matrix = feature_matrix(unscaled)
+    steps = optimizer.solve(matrix, 0.5)
+    assert (steps >= 0).all()
+    assert (matrix + steps <= np.maximum(optimizer.caps, matrix) + 1e-6).all()
+    assert (steps[:, optimizer.fixed] == 0).all()
+
+
+def test_coded_features_move_in_whole_steps(optimizer, unscaled):
+    changes = optimizer.solve(unscaled, 0.5)
+    np.testing.assert_allclose(changes[:, optimizer.coded], np.round(changes[:, optimizer.coded]), atol=1e-6)
+
+
+def test_unreachable_target_uses_all_headroom(optimizer, unscaled):
+    # Only the portfolio's best customer scores 1 already
+    unreached = ~optimizer.plans(unscaled, 1.0)['REACHED'].to_numpy()
+    assert unreached.sum() == len(unscaled) - 1
+    # Every changeable feature is raised to its cap
+    matrix = feature_matrix(unscaled)[unreached]
+    planned = matrix + optimizer.solve(matrix, 1.0)
+    movable = ~optimizer.fixed
+    np.testing.assert_allclose(planned[:, movable], np.maximum(optimizer.caps, matrix)[:, movable], atol=1e-6)
+
+
+def test_costlier_feature_takes_less_of_the_change(unscaled):
+    model = ScoringModel.fit(unscaled)
+    caps = feature_caps(unscaled)
+    i = FEATURES.index('MONTHLY_INCOME')
+    default = TargetOptimizer(model, caps).solve(unscaled, 0.4)
+    expensive = TargetOptimizer(model, caps, {'MONTHLY_INCOME': 100.0}).solve(unscaled, 0.4)
+    # Per customer, whole-step codes can shift the balance either way; overall the costlier feature moves less
+    assert expensive[:, i].sum() < default[:, i].sum()
@@ -0,0 +1,70 @@
+"""Checks of the percentile rank index."""
+import numpy as np
+import pytest
+
+from erica.incremental import append_quarter
+from erica.ranks import RANK_KEYS, RankIndex, load_rank_index, ordinal, percentile_rank, rank_frame, rank_path
+from erica.scoring import SCORE_COLUMNS
+from erica.store import open_store
+
+
+def assert_same_index(index, expected):
+    assert set(index.cells) == set(expected.cells)
+    for cell in expected.cells:
+        for column in SCORE_COLUMNS:
+            np.testing.assert_array_equal(index.group_values(column, *cell), expected.group_values(column, *cell))
+
+
+def test_percentile_rank_counts_ties_as_half():
+    values = np.array([1.0, 2.0, 2.0, 3.0])
+    assert percentile_rank(values, 2.0) == 50
+    assert percentile_rank(values, 0.5) == 0
+    assert percentile_rank(values, 3.5) == 100
+    assert percentile_rank(values[:0], 1.0) is None
+    assert [ordinal(rank) for rank in (1, 2, 3, 11, 12.4, 22, 100)] == ['1st', '2nd', '3rd', '11th', '12th', '22nd',
+                                                                        '100th']
+
+
+def test_rank_index_insert_matches_build(score_store):
+    frame = rank_frame(score_store)
+    # Mix in a second group and customers without one, so every rank set has several cells
+    groups = frame['CUSTOMER_GROUP'].cat.add_categories(['BUSINESS BANKING'])
+    groups[frame.index % 3 == 0] = 'BUSINESS BANKING'
+    groups[frame.index % 7 == 0] = np.nan
+    frame = frame.assign(CUSTOMER_GROUP=groups)
+
+    old = frame.index < len(frame) // 2
+    assert_same_index(RankIndex.build(frame[old]).insert(frame[~old]), RankIndex.build(frame))
+
+
+def test_rank_index_percentiles(score_store):
+    frame = rank_frame(score_store)
+    rank_index = RankIndex.build(frame)
+    customer = frame.iloc[0]
+    ranks = rank_index.percentiles(customer, *customer[RANK_KEYS])
+    peers = frame[(frame[RANK_KEYS] == customer[RANK_KEYS]).all(axis=1)]
+    for column in SCORE_COLUMNS:
+        values, value = peers[column].to_numpy(), customer[column]
+        expected = 100 * ((values < value).sum() + (values <= value).sum()) / (2 * len(values))
+        assert ranks[column] == pytest.approx(expected)
+
+
+def test_rank_index_save_and_load(score_store, tmp_path):
+    rank_index = RankIndex.build(rank_frame(score_store))
+    path = str(tmp_path / 'ranks.arrow')
+    rank_index.save(path)
+    assert_same_index(RankIndex.load(path), rank_index)
+
+
+def test_appended_quarter_extends_rank_index(base_dir, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    score_store = open_store(base_dir, store_dir)
+    load_rank_index(score_store)
+
+    # The latest quarter again as a new one
+    rows = score_store.unscaled[score_store.unscaled['QUARTER'] == score_store.quarters[0]].assign(QUARTER='Q2 2024')
+    manifest = append_quarter('Q2 2024', rows, base_dir, store_dir)
+    appended = open_store(base_dir, store_dir)
+    assert appended.version == manifest['version'] != score_store.version
+    extended = RankIndex.load(rank_path(store_dir, appended.version))
+    assert_same_index(extended, RankIndex.build(rank_frame(appended)))
@@ -0,0 +1,73 @@
+"""Checks of the portfolio what-if loan scenarios."""
+import numpy as np
+import pytest
+
+from erica.scenarios import (DEFAULT_SCENARIO, Scenario, apply_loan, rank_by_boost, recommend_loans, run_scenario,
+                             run_scenarios)
+from erica.scoring import RESILIENCE_SCORE, ScoringModel
+
+
+def page_recommendation(monthly_income, rate=0.06, years=5, share=0.15, cap=0.2):
+    # The Future Loans recommendation as the dashboard computed it for one customer
+    def installment(principal):
+        monthly_rate = rate / 12
+        if monthly_rate == 0:
+            return principal / (years * 12)
+        return principal * monthly_rate / (1 - (1 + monthly_rate) ** (-12 * years))
+
+    loan = round(monthly_income * share * 12 * years, -1)
+    payment = round(installment(loan), -1)
+    if payment > monthly_income * cap:
+        loan = monthly_income * cap * (1 - (1 + rate / 12) ** (-12 * years)) / (rate / 12)
+        payment = installment(loan)
+    return loan, payment
+
+
+@pytest.fixture(scope='module')
+def model(unscaled):
+    return ScoringModel.fit(unscaled)
+
+
+def test_recommend_loans_matches_page(unscaled):
+    incomes = unscaled['MONTHLY_INCOME'].to_numpy()
+    loans, installments = recommend_loans(incomes)
+    expected = np.array([page_recommendation(income) for income in incomes])
+    np.testing.assert_allclose(loans, expected[:, 0], rtol=1e-12)
+    np.testing.assert_allclose(installments, expected[:, 1], rtol=1e-12)
+
+
+def test_installments_stay_within_cap():
+    incomes = np.array([0.0, 1000.0, 25000.0, 128745.85])
+    scenario = Scenario(interest_rate=0.12, tenor_years=3, income_share=0.5, max_installment_share=0.2)
+    _, installments = recommend_loans(incomes, scenario)
+    assert (installments <= incomes * 0.2 + 1e-6).all()
+
+
+def test_run_scenario_matches_rescoring_each_row(unscaled, model):
+    rows = unscaled.iloc[:50]
+    result = run_scenario(rows, model)
+    for i in range(len(rows)):
+        row = rows.iloc[[i]]
+        loan, installment = recommend_loans(row['MONTHLY_INCOME'].to_numpy())
+        adjusted = apply_loan(row, loan, installment, DEFAULT_SCENARIO.loan_behavior)
+        assert result['NEW_' + RESILIENCE_SCORE].iloc[i] == pytest.approx(model.score(adjusted)[RESILIENCE_SCORE].iloc[0])
+    np.testing.assert_allclose(result['Resilience_Boost'],
+                               result['NEW_' + RESILIENCE_SCORE] - result[RESILIENCE_SCORE])
+
+
+def test_loan_behavior_label_matches_code(unscaled, model):
+    by_label = run_scenario(unscaled, model, Scenario(loan_behavior='Current'))
+    by_code = run_scenario(unscaled, model, Scenario(loan_behavior=model.mappings['LOAN_BEHAVIOR']['Current']))
+    np.testing.assert_array_equal(by_label['NEW_' + RESILIENCE_SCORE], by_code['NEW_' + RESILIENCE_SCORE])
+    kept = run_scenario(unscaled, model, Scenario(loan_behavior=None))
+    assert not np.array_equal(kept['NEW_' + RESILIENCE_SCORE], by_code['NEW_' + RESILIENCE_SCORE])
+
+
+def test_scenarios_stack_and_rank(unscaled, model):
+    scenarios = [Scenario('short', tenor_years=3), Scenario('long', tenor_years=7)]
+    results = run_scenarios(unscaled, model, scenarios)
+    assert len(results) == 2 * len(unscaled)
+    assert results['SCENARIO'].unique().tolist() == ['short', 'long']
+    top = rank_by_boost(results, top=10)
+    assert len(top) == 10 and top['Resilience_Boost'].is_monotonic_decreasing
+    assert top['Resilience_Boost'].iloc[0] == results['Resilience_Boost'].max()
@@ -0,0 +1,39 @@
+"""Checks of the compact column types."""
+import numpy as np
+import pandas as pd
+
+from erica.schema import CATEGORY_COLUMNS, CODE_COLUMNS, compact, customer_keys, key_lookup
+from erica.scoring import SCORE_COLUMNS
+from erica.store import read_frame, write_frame
+
+
+def test_compact_round_trips_through_arrow(unscaled, tmp_path):
+    table = compact(unscaled)
+    path = str(tmp_path / 'table.arrow')
+    write_frame(table, path)
+    read = read_frame(path)
+    pd.testing.assert_frame_equal(read, table)
+
+    assert all(isinstance(read[column].dtype, pd.CategoricalDtype) for column in CATEGORY_COLUMNS if column in read)
+    assert all(read[column].dtype == np.int8 for column in CODE_COLUMNS)
+    assert all(read[column].dtype == np.float32 for column in SCORE_COLUMNS)
+    # Amounts and IDs keep their full precision
+    assert read['CUSTOMER_ID'].dtype == np.float64
+    np.testing.assert_array_equal(read['MONTHLY_INCOME'].to_numpy(), unscaled['MONTHLY_INCOME'].to_numpy())
+    for column in CATEGORY_COLUMNS:
+        if column in read:
+            assert (read[column].astype(object) == unscaled[column]).all()
+
+
+def test_compact_keeps_missing_codes():
+    frame = pd.DataFrame({'SEC': [1.0, np.nan, 3.0], 'GENDER': [1.0, 2.0, 1.0]})
+    table = compact(frame)
+    assert table['SEC'].dtype == np.float32 and table['SEC'].isna().sum() == 1
+    assert table['GENDER'].dtype == np.int8
+
+
+def test_customer_keys_extend_known_keys():
+    keys = customer_keys([30.5, 10.5, 20.5, 10.5])
+    np.testing.assert_array_equal(keys, [2, 0, 1, 0])
+    known = key_lookup(pd.DataFrame({'CUSTOMER_ID': [30.5, 10.5, 20.5], 'CUSTOMER_KEY': [2, 0, 1]}))
+    np.testing.assert_array_equal(customer_keys([5.5, 20.5, 40.5], known), [3, 1, 4])
@@ -0,0 +1,60 @@
+"""Checks of the batch scoring model and its fitted artifact."""
+import json
+
+import numpy as np
+import pytest
+
+from erica.scoring import SCORE_COLUMNS, ScoringModel, classify_risk, load_store_model, score_table
+
+
+def test_scoring_model_matches_published_scores(unscaled, published):
+    scores = ScoringModel.fit(unscaled).score(unscaled)
+    np.testing.assert_allclose(scores.to_numpy(), published[SCORE_COLUMNS].to_numpy(), rtol=0, atol=1e-12)
+    assert score_table(unscaled).equals(scores)
+
+
+def test_scoring_model_round_trips(unscaled, tmp_path):
+    model = ScoringModel.fit(unscaled)
+    model.save(str(tmp_path / 'scoring.json'))
+    loaded = ScoringModel.load(str(tmp_path / 'scoring.json'))
+    np.testing.assert_array_equal(loaded.score_array(unscaled), model.score_array(unscaled))
+
+
+def test_scoring_model_update_matches_fit(unscaled):
+    half = len(unscaled) // 2
+    model = ScoringModel.fit(unscaled.iloc[:half]).update(unscaled.iloc[half:])
+    fitted = ScoringModel.fit(unscaled)
+    np.testing.assert_allclose(model.mean, fitted.mean)
+    np.testing.assert_allclose(model.std, fitted.std)
+    assert model.count == len(unscaled)
+    # Updated bounds only cover the new rows; refitting them over every row gives the full fit's scores
+    np.testing.assert_allclose(model.refit_bounds(unscaled).score_array(unscaled), fitted.score_array(unscaled),
+                               atol=1e-12)
+
+
+def test_failed_save_keeps_previous_artifact(unscaled, tmp_path, monkeypatch):
+    path = str(tmp_path / 'scoring.json')
+    model = ScoringModel.fit(unscaled)
+    model.save(path)
+
+    def interrupted(obj, f, **kwargs):
+        f.write('{"mean": [')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(json, 'dump', interrupted)
+    with pytest.raises(OSError):
+        model.save(path)
+    monkeypatch.undo()
+    np.testing.assert_array_equal(ScoringModel.load(path).mean, model.mean)
+    assert sorted(entry.name for entry in tmp_path.iterdir()) == ['scoring.json']
+
+
+def test_store_model_is_fitted_once(score_store):
+    model = load_store_model(score_store)
+    assert model.source == score_store.manifest['source']
+    np.testing.assert_array_equal(load_store_model(score_store).mean, model.mean)
+
+
+def test_classify_risk_bounds():
+    assert [classify_risk(score) for score in (-0.6, -0.5, 0.49, 0.5)] == ['High Risk', 'Moderate Risk',
+                                                                         'Moderate Risk', 'Low Risk']
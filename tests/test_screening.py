@@ -0,0 +1,73 @@
+"""Checks of the portfolio screener's bitmaps."""
+import numpy as np
+import pytest
+
+from erica.screening import _BYTE_BITS, RISK_COLUMN, Screener, _popcount
+from erica.scoring import FACTOR_THRESHOLDS, SCORE_COLUMNS, classify_risk
+
+SCREENS = [
+    {},
+    {'risk': 'Moderate Risk'},
+    {'risk': ['Low Risk', 'High Risk']},
+    {'weak': 'Credit Reliability_Score'},
+    {'weak': ['Financial Health_Score', 'Customer Engagement_Score'], 'segment': [3, 6]},
+    {'risk': 'Moderate Risk', 'location': 'NATIONAL CAPITAL REGION', 'segment': 3,
+     'weak': 'Socioeconomic Stability_Score'},
+    {'location': 'NOWHERE'},
+]
+
+
+@pytest.fixture(scope='module')
+def screener(score_store):
+    return Screener(score_store)
+
+
+@pytest.fixture(scope='module')
+def latest(score_store):
+    # Each customer's latest row, with unscaled peer keys; the store is ordered newest quarter first
+    rows = score_store.unscaled.drop(columns=SCORE_COLUMNS).join(score_store.scaled[SCORE_COLUMNS])
+    latest = rows.drop_duplicates('CUSTOMER_ID', ignore_index=True)
+    latest[RISK_COLUMN] = [classify_risk(score) for score in latest['Resilience_Score']]
+    return latest
+
+
+def pandas_screen(latest, risk=None, weak=None, location=None, segment=None, group=None):
+    # The same screen as boolean filters on a frame
+    def listed(values):
+        return values if isinstance(values, list) else [values]
+
+    keep = np.ones(len(latest), dtype=bool)
+    for column, values in [(RISK_COLUMN, risk), ('CUSTOMER_LOCATION', location), ('CUSTOMER_SEGMENT', segment),
+                           ('CUSTOMER_GROUP', group)]:
+        if values is not None:
+            keep &= latest[column].isin(listed(values)).to_numpy()
+    for factor in listed(weak) if weak is not None else []:
+        keep &= (latest[factor] < FACTOR_THRESHOLDS[factor]).to_numpy()
+    return latest[keep]
+
+
+@pytest.mark.parametrize('filters', SCREENS)
+def test_screen_matches_pandas_filter(screener, latest, filters):
+    expected = pandas_screen(latest, **filters)
+    assert screener.count(**filters) == len(expected)
+    np.testing.assert_array_equal(screener.positions(**filters), expected.index.to_numpy())
+    selected = screener.select(**filters)
+    np.testing.assert_array_equal(selected['CUSTOMER_ID'], expected['CUSTOMER_ID'])
+    assert selected[RISK_COLUMN].astype(str).tolist() == expected[RISK_COLUMN].tolist()
+
+
+def test_select_lists_weak_factors(screener):
+    selected = screener.select(weak='Credit Reliability_Score')
+    assert len(selected) > 0
+    assert selected['WEAK_FACTORS'].str.contains('Credit Reliability').all()
+
+
+def test_risk_counts_sum_to_matches(screener):
+    counts = screener.risk_counts(('CUSTOMER_SEGMENT',), location='NATIONAL CAPITAL REGION')
+    assert counts.to_numpy().sum() == screener.count(location='NATIONAL CAPITAL REGION')
+    assert list(counts.columns) == ['High Risk', 'Moderate Risk', 'Low Risk']
+
+
+def test_popcount_table_matches_bitwise_count():
+    bits = np.random.default_rng(0).integers(0, 256, 1000).astype(np.uint8)
+    assert _popcount(bits) == int(_BYTE_BITS[bits].sum()) == sum(bin(b).count('1') for b in bits.tolist())
@@ -0,0 +1,82 @@
+"""Checks of the correlation-based feature selection."""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import chi2_contingency, pearsonr, spearmanr
+
+from erica.scoring import encode_categories
+from erica.selection import (association_matrix, category_codes, cramers_v, feature_kinds, high_association_pairs,
+                             prune)
+
+FEATURES = ['SEC', 'CUSTOMER_LOCATION', 'AGE', 'GENDER', 'EDUCATION', 'MONTHLY_INCOME', 'SAVINGS_ACCOUNT_INDICATOR']
+
+
+def notebook_cramers_v(x, y):
+    # The notebook's Cramér's V from a crosstab and chi2_contingency
+    confusion_matrix = pd.crosstab(x, y)
+    chi2 = chi2_contingency(confusion_matrix)[0]
+    n = confusion_matrix.sum().sum()
+    phi2 = chi2 / n
+    r, k = confusion_matrix.shape
+    phi2corr = max(0, phi2 - ((k - 1) * (r - 1)) / (n - 1))
+    rcorr = r - ((r - 1) ** 2) / (n - 1)
+    kcorr = k - ((k - 1) ** 2) / (n - 1)
+    return np.sqrt(phi2corr / min((kcorr - 1), (rcorr - 1)))
+
+
+def notebook_matrix(frame, features, kinds):
+    # One scipy call per pair, in the notebook's order of checks
+    frame = frame[features].dropna()
+    matrix = pd.DataFrame(np.eye(len(features)), index=features, columns=features)
+    for i, a in enumerate(features):
+        for b in features[:i]:
+            x, y = frame[a], frame[b]
+            if 'ordinal' in (kinds[a], kinds[b]):
+                # spearmanr ranks the location labels alphabetically
+                x, y = (pd.factorize(v, sort=True)[0] if kinds[f] == 'nominal' else v for f, v in ((a, x), (b, y)))
+                value = spearmanr(x, y)[0]
+            elif 'nominal' in (kinds[a], kinds[b]):
+                value = notebook_cramers_v(category_codes(x, kinds[a]), category_codes(y, kinds[b]))
+            else:
+                value = pearsonr(x, y)[0]
+            matrix.loc[a, b] = matrix.loc[b, a] = value
+    return matrix
+
+
+@pytest.fixture(scope='module')
+def frame(unscaled):
+    return encode_categories(unscaled)
+
+
+def test_feature_kinds(frame):
+    kinds = feature_kinds(frame, FEATURES)
+    assert kinds == {'SEC': 'ordinal', 'CUSTOMER_LOCATION': 'nominal', 'AGE': 'continuous', 'GENDER': 'binary',
+                     'EDUCATION': 'ordinal', 'MONTHLY_INCOME': 'continuous', 'SAVINGS_ACCOUNT_INDICATOR': 'binary'}
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_association_matrix_matches_notebook_statistics(frame, workers):
+    kinds = feature_kinds(frame, FEATURES)
+    matrix = association_matrix(frame, FEATURES, kinds, workers=workers)
+    pd.testing.assert_frame_equal(matrix, notebook_matrix(frame, FEATURES, kinds), rtol=1e-9, atol=1e-12)
+
+
+@pytest.mark.parametrize('shape', [(2, 2), (2, 5), (7, 3)])
+def test_cramers_v_matches_chi2_contingency(shape):
+    rng = np.random.default_rng(shape[0] * 10 + shape[1])
+    x = rng.integers(0, shape[0], 500)
+    # Related to x, so the association is well away from zero
+    y = np.where(rng.random(500) < 0.4, x % shape[1], rng.integers(0, shape[1], 500))
+    assert cramers_v(x, y) == pytest.approx(notebook_cramers_v(x, y), rel=1e-12)
+
+
+def test_prune_drops_one_of_each_strong_pair():
+    features = ['a', 'b', 'c', 'd']
+    matrix = pd.DataFrame([[1.0, 0.9, 0.1, 0.2],
+                           [0.9, 1.0, 0.3, -0.85],
+                           [0.1, 0.3, 1.0, 0.0],
+                           [0.2, -0.85, 0.0, 1.0]], index=features, columns=features)
+    pairs = high_association_pairs(matrix)
+    assert list(zip(pairs['feature'], pairs['other'])) == [('a', 'b'), ('b', 'd')]
+    # b is the more redundant feature of both pairs, so dropping it keeps the rest
+    assert prune(matrix) == ['a', 'c', 'd']
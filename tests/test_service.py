@@ -0,0 +1,115 @@
+"""Checks of the scoring service's responses and its rejection of bad requests.
+
+Requests go straight through the ASGI interface, so no HTTP client is needed.
+"""
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from erica.service import ScoringService, create_app
+
+# The example customer of the module docstrings
+CUSTOMER_ID = 17582714.2857
+
+
+async def _request(app, method, path, query='', body=None):
+    # One HTTP request through the ASGI interface; the body is sent as is when it is already bytes
+    payload = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b''
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': payload, 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+             'root_path': '', 'headers': [(b'content-type', b'application/json')], 'client': ('test', 1),
+             'server': ('test', 80), 'state': {}}
+    await app(scope, receive, send)
+    status = next(message['status'] for message in messages if message['type'] == 'http.response.start')
+    data = b''.join(message.get('body', b'') for message in messages if message['type'] == 'http.response.body')
+    return status, json.loads(data)
+
+
+def _call(app, *requests):
+    """Responses to the requests, sent in order between the app's startup and shutdown."""
+    async def run():
+        events, started = asyncio.Queue(), asyncio.Event()
+
+        async def receive():
+            return await events.get()
+
+        async def send(message):
+            if message['type'] == 'lifespan.startup.complete':
+                started.set()
+
+        lifespan = asyncio.create_task(app({'type': 'lifespan', 'asgi': {'version': '3.0'}, 'state': {}},
+                                           receive, send))
+        await events.put({'type': 'lifespan.startup'})
+        await started.wait()
+        responses = [await _request(app, *request) for request in requests]
+        await events.put({'type': 'lifespan.shutdown'})
+        await lifespan
+        return responses
+
+    return asyncio.run(run())
+
+
+@pytest.fixture(scope='module')
+def app(score_store):
+    return create_app(ScoringService(score_store), coalesce_window=0)
+
+
+def test_service_serves_published_scores(app, published):
+    latest = published[published['CUSTOMER_ID'] == CUSTOMER_ID].iloc[0]
+    (status, body), = _call(app, ('GET', f'/customers/{CUSTOMER_ID}/score'))
+    assert status == 200
+    assert body['customer_id'] == CUSTOMER_ID
+    # Stored as float32, and served without the digits widening to float64 would add
+    assert body['resilience_score'] == float(str(np.float32(latest['Resilience_Score'])))
+
+
+@pytest.mark.parametrize('method, path, query, body', [
+    ('GET', '/customers/abc/score', '', None),
+    ('GET', '/customers/abc/recommendation', '', None),
+    ('GET', f'/customers/{CUSTOMER_ID}/recommendation', 'tenor=5', None),
+    ('GET', f'/customers/{CUSTOMER_ID}/recommendation', 'interest_rate=high', None),
+    ('GET', f'/customers/{CUSTOMER_ID}/recommendation', 'interest_rate=-0.1', None),
+    ('GET', f'/customers/{CUSTOMER_ID}/recommendation', 'tenor_years=0', None),
+    ('GET', f'/customers/{CUSTOMER_ID}/recommendation', 'income_share=inf', None),
+    ('GET', f'/customers/{CUSTOMER_ID}/recommendation', 'max_installment_share=nan', None),
+    ('POST', '/score/batch', '', b'not json'),
+    ('POST', '/score/batch', '', {'ids': [CUSTOMER_ID]}),
+    ('POST', '/score/batch', '', {'customer_ids': CUSTOMER_ID}),
+    ('POST', '/score/batch', '', {'customer_ids': ['abc']}),
+    ('POST', '/recommendations/batch', '', {'customer_ids': [CUSTOMER_ID], 'scenario': {'tenor_years': -5}}),
+    ('POST', '/recommendations/batch', '', {'customer_ids': [CUSTOMER_ID], 'scenario': {'loan_behavior': 'NONE'}}),
+    ('POST', '/recommendations/batch', '', {'customer_ids': [CUSTOMER_ID], 'scenario': {'loan_behavior': 99}}),
+    ('POST', '/recommendations/batch', '', {'customer_ids': [CUSTOMER_ID], 'scenario': {'loan_behavior': [3]}}),
+    ('POST', '/recommendations/batch', '', {'customer_ids': [CUSTOMER_ID], 'scenario': {'loan_behavior': True}}),
+    ('POST', '/recommendations/batch', '', {'customer_ids': [CUSTOMER_ID], 'scenario': [1]}),
+    ('POST', '/recommendations/batch', '', {'customer_ids': [CUSTOMER_ID], 'scenario': 'fast'}),
+    ('GET', f'/customers/{CUSTOMER_ID}/recommendation', 'loan_behavior=99', None),
+])
+def test_service_rejects_bad_requests(app, method, path, query, body):
+    (status, response), = _call(app, (method, path, query, body))
+    assert status == 400
+    assert response['error']
+
+
+def test_service_unknown_customer_is_not_found(app):
+    (status, _), = _call(app, ('GET', '/customers/1.5/score'))
+    assert status == 404
+
+
+@pytest.mark.parametrize('loan_behavior', ['keep', 'Current', 3, '3'])
+def test_service_accepts_known_loan_behaviors(app, loan_behavior):
+    body = {'customer_ids': [CUSTOMER_ID], 'scenario': {'loan_behavior': loan_behavior}}
+    (status, response), = _call(app, ('POST', '/recommendations/batch', '', body))
+    assert status == 200
+    result, = response['results']
+    assert 0 <= result['new_resilience_score'] <= 1
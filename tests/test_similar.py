@@ -0,0 +1,70 @@
+"""Checks of the similar customers index."""
+import numpy as np
+import pytest
+
+from erica.similar import SIMILARITY_FEATURES, SimilarityIndex, feature_matrix, load_similarity_index
+
+
+@pytest.fixture(scope='module')
+def similarity_index(score_store):
+    return SimilarityIndex.build(score_store)
+
+
+def brute_force(score_store, position, k):
+    # Distances from one customer to every other customer's latest row, standardized over the latest rows
+    latest = score_store.scaled.drop_duplicates('CUSTOMER_ID').index.to_numpy()
+    matrix = feature_matrix(score_store.table, latest).astype(np.float64)
+    vectors = (matrix - matrix.mean(axis=0)) / matrix.std(axis=0)
+    query = vectors[np.flatnonzero(latest == position)[0]]
+    distances = np.sqrt(((vectors - query) ** 2).sum(axis=1))
+    keep = latest != position
+    order = np.argsort(distances[keep], kind='stable')[:k]
+    return latest[keep][order], distances[keep][order]
+
+
+def test_index_holds_each_customer_once(score_store, similarity_index):
+    ids = score_store.scaled['CUSTOMER_ID']
+    assert len(similarity_index) == ids.nunique()
+    assert sorted(ids.iloc[similarity_index.rows]) == sorted(ids.unique())
+    assert similarity_index.vectors.shape == (len(similarity_index), len(SIMILARITY_FEATURES))
+    assert similarity_index.offsets[-1] == len(similarity_index)
+
+
+def test_exact_search_matches_brute_force(score_store, similarity_index):
+    for position in similarity_index.rows[:20]:
+        vector = similarity_index.vector(score_store.table, position)
+        rows, distances = similarity_index.exact_search(vector, k=10, exclude=position)
+        expected_rows, expected_distances = brute_force(score_store, position, 10)
+        np.testing.assert_allclose(distances, expected_distances, rtol=1e-4, atol=1e-4)
+        assert position not in rows and np.isin(rows, expected_rows).mean() >= 0.9
+
+
+def test_probing_every_cluster_is_exact(score_store, similarity_index):
+    clusters = len(similarity_index.centroids)
+    for position in similarity_index.rows[::50]:
+        vector = similarity_index.vector(score_store.table, position)
+        rows, distances = similarity_index.search(vector, k=10, nprobe=clusters, exclude=position)
+        exact_rows, exact_distances = similarity_index.exact_search(vector, k=10, exclude=position)
+        np.testing.assert_array_equal(rows, exact_rows)
+        np.testing.assert_array_equal(distances, exact_distances)
+
+
+def test_recall_grows_with_probes(score_store, similarity_index):
+    recalls = [similarity_index.recall(score_store.table, k=10, nprobe=nprobe, sample=100) for nprobe in (1, 4, 8)]
+    assert recalls == sorted(recalls) and recalls[-1] >= 0.95
+    assert similarity_index.recall(score_store.table, k=10, nprobe=len(similarity_index.centroids)) == 1.0
+
+
+def test_neighbors_are_nearest_first(score_store, similarity_index):
+    position = similarity_index.rows[0]
+    neighbors = similarity_index.neighbors(score_store, position, k=5)
+    assert len(neighbors) == 5 and neighbors['DISTANCE'].is_monotonic_increasing
+    assert score_store.scaled['CUSTOMER_ID'].iloc[position] not in set(neighbors['CUSTOMER_ID'])
+
+
+def test_index_is_saved_per_version(score_store, similarity_index):
+    loaded = load_similarity_index(score_store)
+    assert loaded.version == score_store.version
+    reloaded = load_similarity_index(score_store)
+    for name in ('centroids', 'vectors', 'rows', 'offsets'):
+        np.testing.assert_array_equal(getattr(reloaded, name), getattr(loaded, name))
@@ -0,0 +1,55 @@
+"""Checks of the score store's publishing and the shared registry."""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from erica.store import StoreRegistry, open_store, read_manifest, replacing, write_manifest
+
+
+def test_registry_swaps_in_published_version(base_dir, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    registry = StoreRegistry(base_dir, store_dir, interval=0)
+    first = registry.current()
+    assert registry.current() is first
+
+    manifest = read_manifest(store_dir)
+    manifest['revision'] += 1
+    write_manifest(store_dir, manifest)
+    second = registry.current()
+    assert second is not first and second.version == manifest['version'] != first.version
+    # Sessions still holding the old store can keep reading it
+    assert first.table.num_rows == second.table.num_rows == len(first.scaled)
+
+
+def test_registry_checks_manifest_once_per_interval(base_dir, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    registry = StoreRegistry(base_dir, store_dir, interval=3600)
+    first = registry.current()
+    manifest = read_manifest(store_dir)
+    manifest['revision'] += 1
+    write_manifest(store_dir, manifest)
+    assert registry.current() is first
+
+
+def test_concurrent_builds_publish_a_whole_store(base_dir, tmp_path):
+    store_dir = str(tmp_path / 'store')
+    with ThreadPoolExecutor(4) as pool:
+        stores = list(pool.map(lambda _: open_store(base_dir, store_dir), range(4)))
+    reopened = open_store(base_dir, store_dir)
+    assert {store.version for store in stores} == {reopened.version}
+    assert all(len(store) == len(reopened) for store in stores)
+    assert not [name for name in os.listdir(store_dir) if name.endswith('.tmp')]
+
+
+def test_replacing_leaves_target_alone_on_failure(tmp_path):
+    path = str(tmp_path / 'file.json')
+    with replacing(path) as scratch, open(scratch, 'w') as f:
+        f.write('old')
+    with pytest.raises(RuntimeError):
+        with replacing(path) as scratch, open(scratch, 'w') as f:
+            f.write('half')
+            raise RuntimeError
+    with open(path) as f:
+        assert f.read() == 'old'
+    assert os.listdir(tmp_path) == ['file.json']